@@ -32,6 +32,11 @@ def install_requirements():
 
 def create_app_script():
     """Create the main app script that will be packaged"""
+    if os.path.exists('app_main.py'):
+        # Keep the checked-in app, it depends on the shared download modules
+        print("✅ Using existing app_main.py")
+        return
+    
     app_script = '''#!/usr/bin/env python3
 """
 YouTube Downloader - macOS App
@@ -654,6 +659,8 @@ def create_html_template():
     <script>
         let currentDownloadId = null;
         let statusInterval = null;
+        let statusSource = null;
+        let lastLoggedProgress = 0;
         
         // Update quality options based on download type
         document.querySelectorAll('input[name="type"]').forEach(radio => {
@@ -669,6 +676,7 @@ def create_html_template():
                     <option value="192k">192k</option>
                     <option value="128k">128k</option>
                     <option value="64k">64k</option>
+                    <option value="original">Original (no re-encode)</option>
                 `;
             } else if (type === 'playlist') {
                 qualitySelect.innerHTML = `
@@ -776,9 +784,8 @@ def create_html_template():
                 const result = await response.json();
                 
                 if (result.success) {
-                    currentDownloadId = result.download_id;
-                    addLog(`Download started with ID: ${currentDownloadId}`, 'success');
-                    startStatusPolling();
+                    addLog(`Download started with ID: ${result.download_id}`, 'success');
+                    startStatusUpdates(result.download_id);
                 } else {
                     addLog(`Failed to start download: ${result.message}`, 'error');
                     showAlert(result.message, 'error');
@@ -789,40 +796,73 @@ def create_html_template():
             }
         });
         
-        function startStatusPolling() {
+        function handleStatus(status) {
+            // Update progress bar
+            const progressFill = document.getElementById('progressFill');
+            const statusText = document.getElementById('status');
+            
+            progressFill.style.width = `${status.progress}%`;
+            statusText.textContent = status.message;
+            
+            // Add log entry for status changes
+            if (status.status === 'completed') {
+                addLog('Download completed successfully!', 'success');
+                showAlert('Download completed! Check your Downloads folder.', 'success');
+                stopStatusUpdates();
+            } else if (status.status === 'error') {
+                addLog(`Download failed: ${status.error}`, 'error');
+                showAlert(`Download failed: ${status.error}`, 'error');
+                stopStatusUpdates();
+            } else if (status.status === 'downloading' && status.progress - lastLoggedProgress >= 10) {
+                lastLoggedProgress = Math.floor(status.progress / 10) * 10;
+                addLog(`Progress: ${status.progress.toFixed(1)}%`, 'info');
+            }
+        }
+        
+        function stopStatusUpdates() {
+            if (statusSource) {
+                statusSource.close();
+                statusSource = null;
+            }
             if (statusInterval) {
                 clearInterval(statusInterval);
+                statusInterval = null;
+            }
+            currentDownloadId = null;
+        }
+        
+        function startStatusUpdates(downloadId) {
+            stopStatusUpdates();
+            currentDownloadId = downloadId;
+            lastLoggedProgress = 0;
+            
+            // Browsers without EventSource fall back to polling
+            if (!window.EventSource) {
+                startStatusPolling();
+                return;
             }
             
+            statusSource = new EventSource(`/download_events/${currentDownloadId}`);
+            statusSource.addEventListener('status', (event) => {
+                handleStatus(JSON.parse(event.data));
+            });
+            
+            // Dropped stream (proxy, server restart): poll instead of letting the browser retry forever
+            statusSource.onerror = () => {
+                statusSource.close();
+                statusSource = null;
+                addLog('Status stream lost, polling for updates instead', 'info');
+                startStatusPolling();
+            };
+        }
+        
+        function startStatusPolling() {
             statusInterval = setInterval(async () => {
                 if (!currentDownloadId) return;
                 
                 try {
                     const response = await fetch(`/download_status/${currentDownloadId}`);
-                    const status = await response.json();
-                    
-                    // Update progress bar
-                    const progressFill = document.getElementById('progressFill');
-                    const statusText = document.getElementById('status');
-                    
-                    progressFill.style.width = `${status.progress}%`;
-                    statusText.textContent = status.message;
-                    
-                    // Add log entry for status changes
-                    if (status.status === 'completed') {
-                        addLog('Download completed successfully!', 'success');
-                        showAlert('Download completed! Check your Downloads folder.', 'success');
-                        clearInterval(statusInterval);
-                        currentDownloadId = null;
-                    } else if (status.status === 'error') {
-                        addLog(`Download failed: ${status.error}`, 'error');
-                        showAlert(`Download failed: ${status.error}`, 'error');
-                        clearInterval(statusInterval);
-                        currentDownloadId = null;
-                    } else if (status.status === 'downloading') {
-                        addLog(`Progress: ${status.progress.toFixed(1)}%`, 'info');
-                    }
-                    
+                    handleStatus(await response.json());
                 } catch (error) {
                     addLog(`Error checking status: ${error}`, 'error');
                 }
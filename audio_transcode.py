@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Audio transcoding pool
+Runs ffmpeg audio conversions off the download threads, one ffmpeg
+process per CPU core, so download workers can go back to the network.
+Sources that already match the requested format are remuxed or kept
+as they are instead of being re-encoded
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Concurrent ffmpeg processes; each one is CPU bound
+DEFAULT_TRANSCODE_WORKERS = int(os.environ.get('YTDL_TRANSCODE_WORKERS', str(os.cpu_count() or 2)))
+
+AUDIO_FORMATS = {
+    'mp3': {'ext': 'mp3', 'encoder': 'libmp3lame', 'codecs': ('mp3',)},
+    'm4a': {'ext': 'm4a', 'encoder': 'aac', 'codecs': ('mp4a', 'aac')},
+    'opus': {'ext': 'opus', 'encoder': 'libopus', 'codecs': ('opus',)},
+}
+
+# Target for audio downloads: mp3, m4a, opus, or original (whatever the site serves)
+DEFAULT_AUDIO_FORMAT = os.environ.get('YTDL_AUDIO_FORMAT', 'mp3').lower()
+if DEFAULT_AUDIO_FORMAT not in AUDIO_FORMATS and DEFAULT_AUDIO_FORMAT != 'original':
+    # Caught here rather than after a download has already finished
+    print(f"[WARNING] Unknown YTDL_AUDIO_FORMAT {DEFAULT_AUDIO_FORMAT!r}, using mp3 "
+          f"(choose from {', '.join(AUDIO_FORMATS)}, original)", file=sys.stderr)
+    DEFAULT_AUDIO_FORMAT = 'mp3'
+
+# Audio-only container for each source codec, used for lossless remuxes
+CODEC_CONTAINERS = {'mp3': 'mp3', 'mp4a': 'm4a', 'aac': 'm4a', 'opus': 'opus', 'vorbis': 'ogg'}
+
+# How a job produced its output file
+PATH_LABELS = {
+    'keep': 'kept as downloaded',
+    'copy': 'remuxed without re-encoding',
+    'transcode': 'transcoded',
+}
+
+# Encode pytube audio while it downloads instead of after; set to 0 to keep the two-pass path
+STREAM_TRANSCODE = os.environ.get('YTDL_STREAM_TRANSCODE', '1') != '0'
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_transcode_pool():
+    """Process-wide transcode pool, created on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = TranscodePool()
+        return _pool
+
+def downloaded_path(info):
+    """Path of the file yt-dlp wrote for a processed info dict, or None"""
+    if not info:
+        return None
+    for download in info.get('requested_downloads') or []:
+        if download.get('filepath'):
+            return download['filepath']
+    return info.get('filepath') or info.get('_filename')
+
+def downloaded_files(info):
+    """
+    [(path, info)] for every file yt-dlp wrote for a processed result;
+    a playlist result lists the file of each entry
+    """
+    if not info:
+        return []
+    if info.get('_type', 'video') != 'video':
+        return [download for entry in info.get('entries') or [] for download in downloaded_files(entry)]
+    path = downloaded_path(info)
+    return [(path, info)] if path else []
+
+def describe_results(results):
+    """'transcoded' for one conversion, '3 files: 2 transcoded, 1 kept as downloaded' for several"""
+    if len(results) == 1:
+        return PATH_LABELS[results[0]['path']]
+    counts = {}
+    for result in results:
+        counts[result['path']] = counts.get(result['path'], 0) + 1
+    return f"{len(results)} files: " + ", ".join(f"{count} {PATH_LABELS[path]}" for path, count in counts.items())
+
+def codec_family(codec):
+    """'mp4a.40.2' -> 'mp4a', 'opus' -> 'opus'; None for unknown or 'none'"""
+    if not codec or codec == 'none':
+        return None
+    return codec.split('.')[0].lower()
+
+def parse_bitrate(value):
+    """Bitrate in kbit/s from 192, '192', '192k' or '160kbps'"""
+    if value in (None, ''):
+        return None
+    try:
+        return float(str(value).lower().rstrip('kbps'))
+    except ValueError:
+        return None
+
+def probe_audio(source):
+    """(codec, kbit/s) of the first audio stream via ffprobe, or (None, None)"""
+    try:
+        output = subprocess.run(
+            ["ffprobe", "-v", "error", "-select_streams", "a:0",
+             "-show_entries", "stream=codec_name,bit_rate", "-of", "default=noprint_wrappers=1", source],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True).stdout.decode(errors='replace')
+    except (FileNotFoundError, subprocess.CalledProcessError):
+        return None, None
+    fields = dict(line.split('=', 1) for line in output.splitlines() if '=' in line)
+    bit_rate = parse_bitrate(fields.get('bit_rate'))
+    return fields.get('codec_name'), bit_rate / 1000 if bit_rate else None
+
+def plan_audio(audio_format, bitrate, source_codec, source_abr):
+    """
+    Pick the cheapest way to satisfy a request: ('keep' | 'copy' |
+    'transcode', output extension). The source is copied when its codec
+    matches and it is not above the requested bitrate; encoding to a
+    higher bitrate would not add quality.
+    """
+    family = codec_family(source_codec)
+    if audio_format == 'original':
+        if family in CODEC_CONTAINERS:
+            return 'copy', CODEC_CONTAINERS[family]
+        return 'keep', None
+    spec = AUDIO_FORMATS[audio_format]
+    if family in spec['codecs']:
+        requested, actual = parse_bitrate(bitrate), parse_bitrate(source_abr)
+        if not requested or not actual or actual <= requested * 1.05:
+            return 'copy', spec['ext']
+    return 'transcode', spec['ext']
+
+def audio_command(source, target, path='transcode', encoder='libmp3lame', bitrate=None):
+    command = ["ffmpeg", "-y", "-loglevel", "error", "-i", source, "-vn"]
+    if path == 'copy':
+        return command + ["-c:a", "copy", target]
+    command += ["-c:a", encoder]
+    if bitrate:
+        command += ["-b:a", f"{parse_bitrate(bitrate):g}k"]
+    return command + [target]
+
+def mp3_command(source, target, bitrate=None):
+    return audio_command(source, target, bitrate=bitrate)
+
+def convert_audio(source, bitrate=None, delete_source=True, audio_format='mp3', source_codec=None, source_abr=None):
+    """
+    Bring one file to audio_format with ffmpeg, remuxing instead of
+    re-encoding when the source already qualifies. Returns a result dict
+    instead of raising; 'path' tells which route was taken.
+    """
+    if source_codec is None:
+        source_codec, probed_abr = probe_audio(source)
+        source_abr = source_abr or probed_abr
+    path, ext = plan_audio(audio_format, bitrate, source_codec, source_abr)
+    target = os.path.splitext(source)[0] + f".{ext}" if ext else source
+    result = {'source': source, 'output': target, 'ok': False, 'error': None, 'path': path}
+    if os.path.abspath(source) == os.path.abspath(target):
+        # Already the right codec in the right container
+        result['path'] = 'keep'
+        result['ok'] = True
+        return result
+    encoder = AUDIO_FORMATS.get(audio_format, AUDIO_FORMATS['mp3'])['encoder']
+    try:
+        subprocess.run(audio_command(source, target, path, encoder, bitrate),
+                       stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
+        if delete_source:
+            os.remove(source)
+        result['ok'] = True
+    except FileNotFoundError:
+        result['output'] = source
+        result['error'] = "FFmpeg not found. Install FFmpeg for MP3 conversion."
+    except subprocess.CalledProcessError as e:
+        result['output'] = source
+        result['error'] = f"FFmpeg failed: {e.stderr.decode(errors='replace').strip() or e}"
+    return result
+
+def pytube_chunks(stream, fetch, on_progress=None):
+    """
+    Yield the bytes of a pytube / pytubefix stream as they arrive.
+    fetch is the library's request.stream; on_progress gets the same
+    arguments as an on_progress_callback.
+    """
+    remaining = stream.filesize
+    for chunk in fetch(stream.url):
+        remaining -= len(chunk)
+        if on_progress:
+            on_progress(stream, chunk, remaining)
+        yield chunk
+
+def stream_to_mp3(chunks, target, bitrate=None):
+    """
+    Encode to MP3 while downloading: every chunk is written straight to
+    ffmpeg's stdin, so the source file never touches disk. Returns the
+    same result dict as convert_audio; raises FileNotFoundError when
+    ffmpeg is missing, before any chunk is consumed.
+    """
+    result = {'source': None, 'output': target, 'ok': False, 'error': None, 'path': 'transcode'}
+    # stderr goes to a file: nobody reads a pipe while chunks are written, and a
+    # chatty ffmpeg would fill it and block both processes
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(mp3_command("pipe:0", target, bitrate),
+                                   stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=errors)
+        try:
+            for chunk in chunks:
+                process.stdin.write(chunk)
+            process.stdin.close()
+        except BrokenPipeError:
+            # ffmpeg gave up on the input; its stderr says why
+            pass
+        except BaseException:
+            process.kill()
+            process.wait()
+            if os.path.exists(target):
+                os.remove(target)
+            raise
+        process.wait()
+        # The end of the log is where ffmpeg says why it stopped
+        errors.seek(max(0, errors.seek(0, os.SEEK_END) - 4096))
+        stderr = errors.read()
+    if process.returncode == 0:
+        result['ok'] = True
+    else:
+        result['error'] = f"FFmpeg failed: {stderr.decode(errors='replace').strip() or process.returncode}"
+        if os.path.exists(target):
+            os.remove(target)
+    return result
+
+class TranscodePool:
+    def __init__(self, max_workers=DEFAULT_TRANSCODE_WORKERS):
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="transcode")
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def submit(self, source, bitrate=None, delete_source=True, on_done=None,
+               audio_format='mp3', source_codec=None, source_abr=None):
+        """
+        Queue a conversion and return a Future for its result dict.
+        on_done(result) is called from the pool thread when it finishes.
+        Pass the source codec / bitrate when known to skip the ffprobe call.
+        """
+        with self._lock:
+            self._pending += 1
+
+        def run():
+            try:
+                result = convert_audio(source, bitrate, delete_source, audio_format, source_codec, source_abr)
+            except Exception as e:
+                # on_done must always run, or callers wait on this file forever
+                result = {'source': source, 'output': source, 'ok': False, 'error': f"Conversion failed: {e}",
+                          'path': 'keep'}
+            finally:
+                with self._lock:
+                    self._pending -= 1
+            if on_done:
+                on_done(result)
+            return result
+
+        return self._executor.submit(run)
+
+    def submit_downloads(self, downloads, bitrate=None, delete_source=True, on_done=None, on_all_done=None,
+                         audio_format='mp3'):
+        """
+        Queue every (path, info) from downloaded_files and return their
+        Futures. on_done(result) is called per file, on_all_done(results)
+        once after the last one; both from pool threads.
+        """
+        results = []
+        remaining = [len(downloads)]
+        lock = threading.Lock()
+
+        def done(result):
+            try:
+                if on_done:
+                    on_done(result)
+            finally:
+                with lock:
+                    results.append(result)
+                    remaining[0] -= 1
+                    last = not remaining[0]
+                if last and on_all_done:
+                    on_all_done(results)
+
+        return [self.submit(path, bitrate, delete_source, done, audio_format,
+                            source_codec=info.get('acodec'), source_abr=info.get('abr'))
+                for path, info in downloads]
+
+    def stats(self):
+        with self._lock:
+            return {'max_workers': self.max_workers, 'pending': self._pending}
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
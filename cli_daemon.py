@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+YouTube Downloader - CLI daemon and thin client
+The daemon keeps yt-dlp imported and its extractors warm behind a Unix
+socket; the client shares cli_ytdlp_works' options but never imports
+yt-dlp, so one-shot runs skip its import cost.
+
+    cli_daemon.py serve                          start the daemon
+    cli_daemon.py -t audio -o music URL ...      submit a batch, stream its events
+    cli_daemon.py --start -f urls.txt --json     start the daemon if needed first
+    cli_daemon.py stop                           shut the daemon down
+
+Protocol: one JSON request line from the client, then the daemon writes
+the batch's JSON events (see cli_ytdlp_works --json), one per line,
+ending with {"event": "exit", "code": N}.
+"""
+
+import startup_timing
+import argparse
+import contextlib
+import json
+import os
+import socket
+import subprocess
+import sys
+import time
+from cli_ytdlp_works import DOWNLOAD_TYPES, read_urls
+
+DEFAULT_SOCKET = os.environ.get(
+    'YTDL_DAEMON_SOCKET', os.path.join(os.path.expanduser('~'), '.ytdownloader', 'daemon.sock'))
+
+# Seconds --start waits for a freshly spawned daemon to listen
+START_TIMEOUT = 15.0
+
+def connect(path=DEFAULT_SOCKET):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(path)
+    except OSError:
+        client.close()
+        raise
+    return client
+
+def daemon_running(path=DEFAULT_SOCKET):
+    try:
+        connect(path).close()
+        return True
+    except OSError:
+        return False
+
+# ---------------------------------------------------------------- daemon
+
+def warm_up():
+    """Import yt-dlp and load the YouTube extractors once, up front"""
+    import yt_dlp
+    with yt_dlp.YoutubeDL({'quiet': True}) as ydl:
+        for ie_key in ('Youtube', 'YoutubeTab'):
+            ydl.get_info_extractor(ie_key)
+
+def serve(path=DEFAULT_SOCKET):
+    """Run the daemon until a 'stop' request or Ctrl+C"""
+    import socketserver
+    import threading
+    import cli_ytdlp_works
+    from cli_progress import JsonEvents
+
+    if daemon_running(path):
+        print(f"[ERROR] A daemon is already listening on {path}")
+        return 1
+    if os.path.exists(path):
+        os.remove(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    print("[INFO] Loading yt-dlp...")
+    started = time.monotonic()
+    warm_up()
+    print(f"[INFO] Warm in {time.monotonic() - started:.2f}s")
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            out = self.connection.makefile('w', encoding='utf-8')
+            events = JsonEvents(stream=out)
+            try:
+                request = json.loads(self.rfile.readline() or b'{}')
+                op = request.get('op', 'batch')
+                if op == 'ping':
+                    events.emit('pong')
+                elif op == 'stop':
+                    events.emit('stopping')
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                elif op == 'batch':
+                    code = self.run_batch(request, events)
+                    events.emit('exit', code=code)
+                else:
+                    events.emit('exit', code=2, error=f"unknown op {op!r}")
+            except ValueError as e:
+                events.emit('exit', code=2, error=str(e))
+            finally:
+                try:
+                    out.close()
+                except OSError:
+                    pass
+
+        def run_batch(self, request, events):
+            urls = [url for url in request.get('urls') or [] if url]
+            download_type = request.get('type', 'video_best')
+            if not urls:
+                raise ValueError("no URLs to download")
+            if download_type not in DOWNLOAD_TYPES:
+                raise ValueError(f"unknown download type {download_type!r}")
+            output_dir = request.get('output') or os.getcwd()
+            workers = int(request.get('workers') or cli_ytdlp_works.DEFAULT_MAX_WORKERS)
+            return cli_ytdlp_works.run_batch(urls, download_type, output_dir, workers, events)
+
+    # Only the owner may submit downloads
+    old_umask = os.umask(0o077)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, Handler)
+    finally:
+        os.umask(old_umask)
+    server.daemon_threads = True
+    print(f"[INFO] Listening on {path}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(path):
+            os.remove(path)
+    print("[INFO] Daemon stopped")
+    return 0
+
+# ---------------------------------------------------------------- client
+
+def start_daemon(path=DEFAULT_SOCKET):
+    """Spawn a detached daemon and wait until it accepts connections"""
+    log_path = os.path.join(os.path.dirname(path), 'daemon.log')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(log_path, 'ab') as log:
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), 'serve', '--socket', path],
+                         stdin=subprocess.DEVNULL, stdout=log, stderr=subprocess.STDOUT,
+                         start_new_session=True)
+    deadline = time.monotonic() + START_TIMEOUT
+    while time.monotonic() < deadline:
+        if daemon_running(path):
+            return True
+        time.sleep(0.1)
+    return False
+
+def request(message, path=DEFAULT_SOCKET):
+    """Send one request and yield the daemon's events as dicts"""
+    client = connect(path)
+    with client, client.makefile('rb') as replies:
+        client.sendall(json.dumps(message).encode('utf-8') + b"\n")
+        for line in replies:
+            yield json.loads(line)
+
+def print_event(event, board, tracked):
+    """Human-readable rendering of daemon events"""
+    from progress_reporter import ProgressRecord
+
+    kind = event['event']
+    job = event.get('job')
+    if kind in ('progress', 'download_finished'):
+        if job not in tracked:
+            tracked[job] = (board.track(), ProgressRecord())
+        update, record = tracked[job]
+        record.status = 'downloading' if kind == 'progress' else 'finished'
+        record.downloaded_bytes = event.get('downloaded_bytes') or event.get('bytes') or 0
+        record.total_bytes = event.get('total_bytes') or (record.downloaded_bytes if kind != 'progress' else None)
+        record.percent = event.get('percent', 100.0)
+        record.speed = event.get('speed')
+        record.eta = event.get('eta')
+        record.filename = event.get('filename')
+        update(record)
+        if kind == 'download_finished':
+            del tracked[job]
+    elif kind == 'batch_start':
+        print(f"[INFO] Batch: {event['urls']} URLs, type {event['type']}, {event['workers']} workers -> {event['output']}")
+    elif kind == 'job_start':
+        print(f"[INFO] ({job}) Starting: {event['url']}")
+    elif kind == 'job_end':
+        status = "[SUCCESS]" if event['ok'] else "[ERROR]"
+        print(f"{status} ({job}) {'Done' if event['ok'] else 'Failed'} in {event['elapsed']:.1f}s: {event['url']}")
+    elif kind == 'postprocess_end' and event.get('postprocessor') == 'transcode':
+        print(f"[INFO] ({job}) Audio {event['path']}: {event['output']}")
+    elif kind == 'item':
+        status = "[SUCCESS]" if event['status'] == 'completed' else "[ERROR]"
+        print(f"{status} ({job}/{event['index']}) {event['title']}")
+    elif kind == 'error':
+        print(f"[ERROR] ({job}) {event['kind']}: {event['message']}")
+    elif kind == 'batch_end':
+        print(f"[INFO] Batch finished: {event['succeeded']} succeeded, {event['failed']} failed")
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Submit downloads to a warm yt-dlp daemon. "
+                                     "Use 'serve' to run the daemon, 'stop' to shut it down.")
+    parser.add_argument("urls", nargs="*", help="URLs to download, or 'serve' / 'stop'")
+    parser.add_argument("-f", "--file", help="read URLs from a file, one per line ('-' for stdin)")
+    parser.add_argument("-t", "--type", default="video_best", choices=DOWNLOAD_TYPES, help="download type")
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="output directory")
+    parser.add_argument("-j", "--workers", type=int, help="URLs downloaded at the same time")
+    parser.add_argument("--json", action="store_true", help="print the daemon's JSON events as they arrive")
+    parser.add_argument("--start", action="store_true", help="start the daemon if it is not running")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="daemon socket path")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    startup_timing.mark_ready("cli_daemon")
+    if args.urls[:1] == ['serve']:
+        return serve(args.socket)
+    if args.urls[:1] == ['stop']:
+        message = {'op': 'stop'}
+    else:
+        urls = list(args.urls) + (read_urls(args.file) if args.file else [])
+        if not urls:
+            print("[ERROR] No URLs to download")
+            return 2
+        message = {'op': 'batch', 'urls': urls, 'type': args.type,
+                   'output': os.path.abspath(args.output), 'workers': args.workers}
+
+    if not daemon_running(args.socket):
+        if not args.start or message['op'] == 'stop':
+            print(f"[ERROR] No daemon on {args.socket}; run 'cli_daemon.py serve' or pass --start", file=sys.stderr)
+            return 3
+        if not start_daemon(args.socket):
+            print("[ERROR] Daemon did not start in time", file=sys.stderr)
+            return 3
+
+    from cli_progress import ProgressBoard
+    board, tracked, code = ProgressBoard(), {}, 1
+    try:
+        with contextlib.nullcontext() if args.json else board:
+            for event in request(message, args.socket):
+                if args.json:
+                    sys.stdout.write(json.dumps(event, separators=(',', ':')) + "\n")
+                    sys.stdout.flush()
+                else:
+                    print_event(event, board, tracked)
+                if event['event'] == 'exit':
+                    code = event['code']
+                    if event.get('error'):
+                        print(f"[ERROR] {event['error']}", file=sys.stderr)
+                elif event['event'] == 'stopping':
+                    code = 0
+    except OSError as e:
+        print(f"[ERROR] Lost connection to the daemon: {e}", file=sys.stderr)
+        return 3
+    except KeyboardInterrupt:
+        # The daemon finishes the batch on its own
+        print("\n[INFO] Detached; the daemon keeps downloading", file=sys.stderr)
+        return 130
+    return code
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,10 +4,19 @@ Simple YouTube Downloader - Command Line Version
 No GUI, no Tkinter, just pure command line interface
 """
 
+import startup_timing
 import sys
 import os
-from pytube import YouTube, Playlist
-import subprocess
+from lazy_import import lazy_module
+from progress_reporter import ProgressReporter
+from cli_progress import ProgressBoard
+from audio_transcode import get_transcode_pool, stream_to_mp3, pytube_chunks, STREAM_TRANSCODE
+
+# Imported on first use so the prompt comes up without waiting for it
+pytube = lazy_module('pytube')
+
+# Redraws download progress at a fixed rate instead of once per chunk
+board = ProgressBoard()
 
 def print_banner():
     print("=" * 50)
@@ -66,24 +75,25 @@ def get_user_input():
     }
 
 def test_url(url):
-    """Test if URL is valid"""
+    """Test if URL is valid; returns the YouTube object for the download, or None"""
     print(f"[INFO] Testing URL: {url}")
     try:
-        yt = YouTube(url)
+        yt = pytube.YouTube(url)
         print(f"[SUCCESS] URL is valid!")
         print(f"[INFO] Title: {yt.title}")
         print(f"[INFO] Length: {yt.length} seconds")
         print(f"[INFO] Available streams: {len(yt.streams)}")
-        return True
+        return yt
     except Exception as e:
         print(f"[ERROR] URL test failed: {e}")
-        return False
+        return None
 
-def download_video(url, output_dir):
-    """Download video"""
+def download_video(url, output_dir, yt=None):
+    """Download video; pass the YouTube object from test_url to skip a second lookup"""
     try:
-        print("[INFO] Fetching video information...")
-        yt = YouTube(url)
+        if yt is None:
+            print("[INFO] Fetching video information...")
+            yt = pytube.YouTube(url)
         
         print(f"[INFO] Downloading: {yt.title}")
         
@@ -98,27 +108,22 @@ def download_video(url, output_dir):
         print("[INFO] Starting download...")
         
         # Download with progress
-        def progress_callback(stream, chunk, bytes_remaining):
-            total = stream.filesize
-            downloaded = total - bytes_remaining
-            percent = (downloaded / total) * 100
-            print(f"\r[INFO] Download progress: {percent:.1f}%", end='', flush=True)
-        
-        yt.register_on_progress_callback(progress_callback)
+        yt.register_on_progress_callback(ProgressReporter(board.track(yt.title)).pytube_callback)
         
         file_path = stream.download(output_path=output_dir)
-        print(f"\n[SUCCESS] Video downloaded: {file_path}")
+        print(f"[SUCCESS] Video downloaded: {file_path}")
         return True
         
     except Exception as e:
-        print(f"\n[ERROR] Download failed: {e}")
+        print(f"[ERROR] Download failed: {e}")
         return False
 
-def download_audio(url, output_dir):
-    """Download audio and convert to MP3"""
+def download_audio(url, output_dir, yt=None):
+    """Download audio and convert to MP3; pass the YouTube object from test_url to skip a second lookup"""
     try:
-        print("[INFO] Fetching audio information...")
-        yt = YouTube(url)
+        if yt is None:
+            print("[INFO] Fetching audio information...")
+            yt = pytube.YouTube(url)
         
         print(f"[INFO] Downloading audio: {yt.title}")
         
@@ -130,60 +135,63 @@ def download_audio(url, output_dir):
             return False
         
         print("[INFO] Starting audio download...")
+        reporter = ProgressReporter(board.track(yt.title))
         
-        # Download with progress
-        def progress_callback(stream, chunk, bytes_remaining):
-            total = stream.filesize
-            downloaded = total - bytes_remaining
-            percent = (downloaded / total) * 100
-            print(f"\r[INFO] Download progress: {percent:.1f}%", end='', flush=True)
+        if STREAM_TRANSCODE:
+            # Encode while downloading; the original audio never hits the disk
+            mp3_file = os.path.join(output_dir, os.path.splitext(stream.default_filename)[0] + ".mp3")
+            try:
+                result = stream_to_mp3(pytube_chunks(stream, pytube.request.stream, reporter.pytube_callback), mp3_file)
+            except FileNotFoundError:
+                print("[WARNING] FFmpeg not found. Install FFmpeg for MP3 conversion.")
+                result = None
+            if result and result['ok']:
+                print(f"[SUCCESS] MP3 saved: {result['output']}")
+                return True
+            if result:
+                print(f"[WARNING] Streaming conversion failed ({result['error']}), downloading file first")
+            reporter.reset()
         
-        yt.register_on_progress_callback(progress_callback)
+        # Download with progress
+        yt.register_on_progress_callback(reporter.pytube_callback)
         
         # Download audio file
         out_file = stream.download(output_path=output_dir)
-        print(f"\n[INFO] Audio downloaded: {out_file}")
+        print(f"[INFO] Audio downloaded: {out_file}")
         
-        # Convert to MP3
+        # Convert to MP3 on the shared transcode pool
         print("[INFO] Converting to MP3...")
-        mp3_file = os.path.splitext(out_file)[0] + ".mp3"
+        result = get_transcode_pool().submit(out_file).result()
         
-        try:
-            subprocess.run([
-                "ffmpeg", "-y", "-i", out_file, mp3_file
-            ], stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=True)
-            
-            # Remove original file
-            os.remove(out_file)
-            print(f"[SUCCESS] MP3 saved: {mp3_file}")
-            return True
-            
-        except subprocess.CalledProcessError:
-            print("[WARNING] FFmpeg not found or failed. Keeping original audio file.")
-            return True
-        except FileNotFoundError:
-            print("[WARNING] FFmpeg not found. Install FFmpeg for MP3 conversion.")
-            return True
+        if result['ok']:
+            print(f"[SUCCESS] MP3 saved: {result['output']}")
+        else:
+            print(f"[WARNING] {result['error']} Keeping original audio file.")
+        return True
             
     except Exception as e:
-        print(f"\n[ERROR] Audio download failed: {e}")
+        print(f"[ERROR] Audio download failed: {e}")
         return False
 
 def download_playlist(url, output_dir):
     """Download playlist"""
     try:
         print("[INFO] Fetching playlist information...")
-        pl = Playlist(url)
+        pl = pytube.Playlist(url)
         
         print(f"[INFO] Playlist: {pl.title}")
-        print(f"[INFO] Videos in playlist: {len(pl.videos)}")
         
         success_count = 0
-        total_count = len(pl.videos)
+        total_count = 0
         
-        for i, video in enumerate(pl.videos, 1):
+        # url_generator pages through the playlist lazily, so the first
+        # video starts downloading before the rest of the list is fetched
+        for i, video_url in enumerate(pl.url_generator(), 1):
+            total_count = i
+            video = None
             try:
-                print(f"\n[{i}/{total_count}] Downloading: {video.title}")
+                video = pytube.YouTube(video_url)
+                print(f"\n[{i}] Downloading: {video.title}")
                 
                 stream = video.streams.filter(progressive=True, file_extension='mp4').first()
                 if stream:
@@ -194,7 +202,7 @@ def download_playlist(url, output_dir):
                     print(f"[ERROR] No stream found for: {video.title}")
                     
             except Exception as e:
-                print(f"[ERROR] Failed to download: {video.title} - {e}")
+                print(f"[ERROR] Failed to download: {video.title if video else video_url} - {e}")
         
         print(f"\n[SUCCESS] Playlist download complete!")
         print(f"[INFO] Successfully downloaded: {success_count}/{total_count} videos")
@@ -206,6 +214,7 @@ def download_playlist(url, output_dir):
 
 def main():
     print_banner()
+    startup_timing.mark_ready("cli_downloader")
     
     while True:
         try:
@@ -214,19 +223,21 @@ def main():
             if not params:
                 continue
             
-            # Test URL first
-            if not test_url(params['url']):
+            # Test URL first; the looked-up video is reused for the download
+            yt = test_url(params['url'])
+            if yt is None:
                 print("\n[ERROR] Invalid URL. Please try again.")
                 continue
             
             # Perform download based on type
             success = False
-            if params['type'] == "video":
-                success = download_video(params['url'], params['output'])
-            elif params['type'] == "audio":
-                success = download_audio(params['url'], params['output'])
-            elif params['type'] == "playlist":
-                success = download_playlist(params['url'], params['output'])
+            with board:
+                if params['type'] == "video":
+                    success = download_video(params['url'], params['output'], yt)
+                elif params['type'] == "audio":
+                    success = download_audio(params['url'], params['output'], yt)
+                elif params['type'] == "playlist":
+                    success = download_playlist(params['url'], params['output'])
             
             if success:
                 print("\n[SUCCESS] Download completed successfully!")
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+"""
+Terminal progress board for the CLIs
+Redraws one line per active download at a fixed frame rate; when stdout
+is not a terminal it prints plain status lines every few seconds instead.
+JsonEvents is the machine-readable alternative: one JSON object per line
+"""
+
+import itertools
+import json
+import os
+import shutil
+import sys
+import threading
+import time
+
+# Redraws per second on a terminal
+DEFAULT_FPS = float(os.environ.get('YTDL_PROGRESS_FPS', '8'))
+
+# Seconds between status lines when stdout is a file or pipe
+DEFAULT_PLAIN_INTERVAL = float(os.environ.get('YTDL_PROGRESS_INTERVAL', '5'))
+
+# Lines without an update for this long are dropped (a job that died mid-download)
+STALE_AFTER = 60.0
+
+BAR_WIDTH = 20
+
+# Substrings of yt-dlp / ffmpeg error messages -> error kind, first match wins
+ERROR_KINDS = [
+    ('unsupported', ('unsupported url', 'is not a valid url')),
+    ('private', ('private video', 'members-only', 'join this channel')),
+    ('auth', ('sign in', 'age-restricted', 'confirm your age', 'login required', 'cookies')),
+    ('geo', ('not available in your country', 'geo restrict', 'geo-restrict')),
+    ('format', ('requested format',)),
+    ('unavailable', ('video unavailable', 'has been removed', 'does not exist', 'no longer available',
+                     'not available', 'http error 404')),
+    ('rate_limited', ('http error 429', 'too many requests')),
+    ('forbidden', ('http error 403', 'forbidden')),
+    ('network', ('timed out', 'timeout', 'connection', 'network', 'temporary failure', 'name resolution',
+                 'urlopen error', 'http error 5', 'incomplete read', 'ssl')),
+    ('ffmpeg', ('ffmpeg', 'ffprobe', 'postprocessing')),
+    ('filesystem', ('no space left', 'permission denied', 'read-only file system', 'errno 28', 'errno 13')),
+]
+
+def classify_error(error):
+    """Coarse error kind for supervisors: retry network / rate_limited, drop unavailable, ..."""
+    message = str(error).lower()
+    for kind, needles in ERROR_KINDS:
+        if any(needle in message for needle in needles):
+            return kind
+    return 'other'
+
+def format_bytes(count):
+    if count is None:
+        return "?"
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if count < 1024 or unit == "GiB":
+            return f"{count:.0f}{unit}" if unit == "B" else f"{count:.1f}{unit}"
+        count /= 1024.0
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
+
+def record_label(record, label=None):
+    if label:
+        return label
+    return os.path.basename(record.filename) if record.filename else "download"
+
+def format_bar(label, record, width):
+    """One terminal line: label, bar, percent, size, speed, ETA"""
+    filled = int(BAR_WIDTH * min(record.percent, 100.0) / 100.0) if record.total_bytes else 0
+    stats = (f" [{'#' * filled}{'-' * (BAR_WIDTH - filled)}] {record.percent:5.1f}% "
+             f"{format_bytes(record.total_bytes or record.downloaded_bytes):>9} "
+             f"{format_bytes(record.speed) + '/s' if record.speed else '':>11} "
+             f"ETA {format_eta(record.eta)}")
+    room = max(10, width - len(stats))
+    if len(label) > room:
+        label = label[:room - 1] + "~"
+    return label.ljust(room) + stats
+
+def format_plain(label, record):
+    """One log-friendly status line"""
+    if record.total_bytes:
+        line = f"[INFO] {label}: {record.percent:.1f}% of {format_bytes(record.total_bytes)}"
+    else:
+        line = f"[INFO] {label}: {format_bytes(record.downloaded_bytes)}"
+    if record.speed:
+        line += f" at {format_bytes(record.speed)}/s"
+    if record.eta is not None:
+        line += f", ETA {format_eta(record.eta)}"
+    return line
+
+class _BoardStream:
+    """Stands in for sys.stdout while the board runs so print() lands above the bars"""
+
+    def __init__(self, board, stream):
+        self._board = board
+        self._stream = stream
+        # print() writes the text and the newline separately; keep threads apart
+        self._local = threading.local()
+
+    def write(self, text):
+        # '\r' progress tricks make no sense between redraws
+        buffered = getattr(self._local, 'partial', "") + text.replace("\r", "")
+        *lines, self._local.partial = buffered.split("\n")
+        for line in lines:
+            self._board.write_line(line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+class ProgressBoard:
+    """
+    Shared progress display. track() hands out ProgressReporter callbacks,
+    set()/remove() manage free-form lines such as playlist totals.
+
+    Use it as a context manager around downloads; it nests, so a batch can
+    hold it open while each download enters it again. While it is open,
+    sys.stdout is redirected through the board.
+    """
+
+    def __init__(self, stream=None, fps=DEFAULT_FPS, plain_interval=DEFAULT_PLAIN_INTERVAL):
+        self._stream = stream
+        self.fps = fps
+        self.plain_interval = plain_interval
+        self._lock = threading.RLock()
+        self._keys = itertools.count()
+        # key -> [label, record or text, last update]
+        self._lines = {}
+        self._drawn = 0
+        self._dirty = False
+        self._depth = 0
+        self._out = None
+        self._saved_stdout = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def tty(self):
+        out = self._out or self._stream or sys.stdout
+        return out.isatty()
+
+    def __enter__(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self._saved_stdout = sys.stdout
+                self._out = self._stream or sys.stdout
+                sys.stdout = _BoardStream(self, self._out)
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run, name="progress-board", daemon=True)
+                self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self._depth -= 1
+            if self._depth:
+                return False
+            self._stop.set()
+            thread = self._thread
+        thread.join()
+        with self._lock:
+            self._lines.clear()
+            self._redraw()
+            if isinstance(sys.stdout, _BoardStream):
+                sys.stdout = self._saved_stdout
+            self._out = self._saved_stdout = None
+        return False
+
+    def track(self, label=None):
+        """Callback for ProgressReporter that keeps one line for this download"""
+        key = next(self._keys)
+
+        def update(record):
+            if record.status == 'downloading':
+                with self._lock:
+                    self._lines[key] = [label, record, time.monotonic()]
+                    self._dirty = True
+            else:
+                self.remove(key)
+                if record.status == 'finished':
+                    self.write_line(f"[INFO] Download completed: {record_label(record, label)}")
+
+        return update
+
+    def set(self, key, text):
+        """Show or replace a free-form line"""
+        with self._lock:
+            self._lines[key] = [None, text, time.monotonic()]
+            self._dirty = True
+
+    def remove(self, key):
+        with self._lock:
+            if self._lines.pop(key, None) is not None:
+                self._dirty = True
+
+    def write_line(self, line):
+        """Print a permanent line above the bars"""
+        with self._lock:
+            out = self._out or self._stream or sys.stdout
+            if out.isatty() and self._drawn:
+                self._redraw(line)
+            else:
+                out.write(line + "\n")
+                out.flush()
+
+    def _run(self):
+        interval = 1.0 / self.fps if self.tty else self.plain_interval
+        while not self._stop.wait(interval):
+            with self._lock:
+                self._drop_stale()
+                if self.tty:
+                    if self._dirty:
+                        self._redraw()
+                elif self._dirty:
+                    self._print_plain()
+
+    def _drop_stale(self):
+        now = time.monotonic()
+        for key in [key for key, line in self._lines.items() if now - line[2] > STALE_AFTER]:
+            del self._lines[key]
+            self._dirty = True
+
+    def _redraw(self, permanent=None):
+        """Rewrite the bar block in one write: cursor up, permanent line, bars, clear the rest"""
+        out = self._out or self._stream or sys.stdout
+        if not out.isatty():
+            return
+        width = shutil.get_terminal_size().columns - 1
+        parts = []
+        if self._drawn:
+            parts.append(f"\x1b[{self._drawn}F")
+        if permanent is not None:
+            parts.append(permanent + "\x1b[K\n")
+        lines = list(self._lines.values())
+        for label, value, _ in lines:
+            text = value if isinstance(value, str) else format_bar(record_label(value, label), value, width)
+            parts.append(text[:width] + "\x1b[K\n")
+        parts.append("\x1b[J")
+        out.write("".join(parts))
+        out.flush()
+        self._drawn = len(lines)
+        self._dirty = False
+
+    def _print_plain(self):
+        out = self._out or self._stream or sys.stdout
+        for label, value, _ in self._lines.values():
+            out.write((value if isinstance(value, str) else format_plain(record_label(value, label), value)) + "\n")
+        out.flush()
+        self._dirty = False
+
+class _EventLogger:
+    """yt-dlp 'logger' that turns its errors and warnings into events"""
+
+    def __init__(self, events, job):
+        self._events = events
+        self._job = job
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        print(msg, file=sys.stderr)
+        self._events.emit('warning', job=self._job, message=msg)
+
+    def error(self, msg):
+        print(msg, file=sys.stderr)
+        self._events.error(self._job, msg)
+
+class JsonEvents:
+    """
+    Writes one JSON object per line to stdout. While open, ordinary
+    print() output is moved to stderr so stdout stays parseable.
+
+    Every event has 'ts' (unix time), 'pid' and 'event'; per-download
+    events also carry 'job'.
+    """
+
+    def __init__(self, stream=None):
+        self._stream = stream
+        self._lock = threading.Lock()
+        self._out = None
+        self._saved_stdout = None
+        self._closed = False
+
+    def __enter__(self):
+        self._saved_stdout = sys.stdout
+        self._out = self._stream or sys.stdout
+        sys.stdout = sys.stderr
+        return self
+
+    def __exit__(self, *exc):
+        sys.stdout = self._saved_stdout
+        self._out = self._saved_stdout = None
+        return False
+
+    def emit(self, event, **fields):
+        line = json.dumps(dict(ts=round(time.time(), 3), pid=os.getpid(), event=event, **fields),
+                          separators=(',', ':'), default=str)
+        with self._lock:
+            if self._closed:
+                return
+            out = self._out or self._stream or sys.stdout
+            try:
+                out.write(line + "\n")
+                out.flush()
+            except (OSError, ValueError):
+                # The reader went away (daemon client disconnected); the downloads carry on
+                self._closed = True
+
+    def progress(self, job, record):
+        """ProgressReporter records, already throttled by the reporter"""
+        if record.status == 'downloading':
+            self.emit('progress', job=job, downloaded_bytes=record.downloaded_bytes,
+                      total_bytes=record.total_bytes, percent=round(record.percent, 1),
+                      speed=record.speed, eta=record.eta, filename=record.filename)
+        elif record.status == 'finished':
+            self.emit('download_finished', job=job, bytes=record.downloaded_bytes, filename=record.filename)
+
+    def error(self, job, error):
+        self.emit('error', job=job, kind=classify_error(error), message=str(error))
+
+    def ydl_options(self, job):
+        """Extra yt-dlp options: error logger and postprocessor start/end events"""
+        def postprocessor_hook(d):
+            if d['status'] in ('started', 'finished'):
+                self.emit('postprocess_start' if d['status'] == 'started' else 'postprocess_end',
+                          job=job, postprocessor=d.get('postprocessor'),
+                          filename=(d.get('info_dict') or {}).get('filepath'))
+
+        return {
+            'logger': _EventLogger(self, job),
+            'postprocessor_hooks': [postprocessor_hook],
+        }
@@ -2,12 +2,61 @@
 """
 YouTube Downloader - CLI Version using yt-dlp
 More reliable than pytube, handles YouTube changes better
+
+Run without arguments for the interactive menu, or pass URLs / a URL
+file for unattended batch downloads:
+    cli_ytdlp_works.py -t audio -o music -j 4 -f urls.txt
+    cat urls.txt | cli_ytdlp_works.py -f -
+Add --json to get one JSON event per line on stdout instead of text
 """
 
+import startup_timing
 import sys
 import os
-import yt_dlp
-import subprocess
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait as wait_all
+from lazy_import import lazy_module
+from progress_reporter import ProgressReporter
+from playlist_runner import PlaylistDownloader, DEFAULT_PLAYLIST_WORKERS
+from download_archive import get_archive
+from audio_transcode import PATH_LABELS, DEFAULT_AUDIO_FORMAT, get_transcode_pool, downloaded_files, downloaded_path
+from job_queue import DEFAULT_MAX_WORKERS
+from cli_progress import ProgressBoard, JsonEvents
+
+# Imported on first use so the prompt comes up without waiting for it
+yt_dlp = lazy_module('yt_dlp')
+
+# Progress display shared by every download, including parallel batch jobs
+board = ProgressBoard()
+
+# Job the current thread works on and where its events go (JsonEvents or None).
+# Thread-local so the daemon can serve several clients at once
+_job = threading.local()
+
+def current_job():
+    return getattr(_job, 'id', None)
+
+def current_events():
+    return getattr(_job, 'events', None)
+
+def current_conversions():
+    """Batch-wide list of (job, Future) for pending audio conversions, or None outside a batch"""
+    return getattr(_job, 'conversions', None)
+
+def ydl_event_options():
+    """yt-dlp options that report errors and postprocessing as events"""
+    events = current_events()
+    return events.ydl_options(current_job()) if events else {}
+
+def report_error(message, error):
+    print(f"[ERROR] {message}: {error}")
+    events = current_events()
+    if events:
+        events.error(current_job(), error)
+
+DOWNLOAD_TYPES = ["video_best", "video_720", "video_480", "audio", "playlist", "playlist_sync"]
 
 def print_banner():
     print("=" * 50)
@@ -29,10 +78,11 @@ def get_user_input():
     print("3. Video (480p)")
     print("4. Audio (MP3)")
     print("5. Playlist")
+    print("6. Playlist sync (new videos only)")
     
     while True:
         try:
-            choice = input("Enter choice (1-5): ").strip()
+            choice = input("Enter choice (1-6): ").strip()
             if choice == "1":
                 download_type = "video_best"
                 break
@@ -48,8 +98,11 @@ def get_user_input():
             elif choice == "5":
                 download_type = "playlist"
                 break
+            elif choice == "6":
+                download_type = "playlist_sync"
+                break
             else:
-                print("Please enter 1-5")
+                print("Please enter 1-6")
         except KeyboardInterrupt:
             print("\nExiting...")
             sys.exit(0)
@@ -74,40 +127,58 @@ def get_user_input():
     }
 
 def test_url(url):
-    """Test if URL is valid using yt-dlp"""
+    """
+    Test if URL is valid using yt-dlp. Returns the unprocessed info
+    (process=False) for the download functions to reuse, or None.
+    """
     print(f"[INFO] Testing URL: {url}")
     try:
         ydl_opts = {
             'quiet': True,
             'no_warnings': True,
-            'extract_flat': True,
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
+            # Playlist entries stay a lazy generator, nothing past page one is fetched
+            info = ydl.extract_info(url, download=False, process=False)
+            if info is None:
+                raise ValueError("no information extracted")
             print(f"[SUCCESS] URL is valid!")
             print(f"[INFO] Title: {info.get('title', 'Unknown')}")
             print(f"[INFO] Duration: {info.get('duration', 'Unknown')} seconds")
             print(f"[INFO] Uploader: {info.get('uploader', 'Unknown')}")
-            return True
+            return info
             
     except Exception as e:
         print(f"[ERROR] URL test failed: {e}")
-        return False
+        return None
+
+def extract_and_download(ydl, url, info=None):
+    """Download url, reusing an unprocessed info from test_url when given"""
+    if info is not None:
+        return ydl.process_ie_result(info, download=True)
+    return ydl.extract_info(url, download=True)
+
+def download_failed(info):
+    """ignoreerrors turns failures into a None result or a missing file"""
+    return not info or (info.get('_type', 'video') == 'video' and not downloaded_path(info))
+
+def progress_hook():
+    """Progress callback for yt-dlp, one per download; it gets its own line on the board"""
+    track = board.track()
+    events = current_events()
+    if events is None:
+        return ProgressReporter(track)
+    job = current_job()
+    
+    def update(record):
+        track(record)
+        events.progress(job, record)
+    
+    return ProgressReporter(update)
 
-def progress_hook(d):
-    """Progress callback for yt-dlp"""
-    if d['status'] == 'downloading':
-        if 'total_bytes' in d and d['total_bytes']:
-            percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-            print(f"\r[INFO] Download progress: {percent:.1f}%", end='', flush=True)
-        elif 'downloaded_bytes' in d:
-            print(f"\r[INFO] Downloaded: {d['downloaded_bytes']} bytes", end='', flush=True)
-    elif d['status'] == 'finished':
-        print(f"\n[INFO] Download completed: {d['filename']}")
-
-def download_video(url, output_dir, quality="best"):
-    """Download video with specified quality"""
+def download_video(url, output_dir, quality="best", info=None):
+    """Download video with specified quality; info is test_url's result, if any"""
     try:
         print("[INFO] Starting video download...")
         
@@ -123,70 +194,266 @@ def download_video(url, output_dir, quality="best"):
         ydl_opts = {
             'format': format_spec,
             'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-            'progress_hooks': [progress_hook],
+            'progress_hooks': [progress_hook()],
+            # The board draws progress; yt-dlp's own '\r' printer would pile up in it
+            'noprogress': True,
             'ignoreerrors': True,
+            **ydl_event_options(),
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+            info = extract_and_download(ydl, url, info)
         
-        print(f"\n[SUCCESS] Video download completed!")
+        if download_failed(info):
+            print(f"[ERROR] Video download failed")
+            return False
+        print(f"[SUCCESS] Video download completed!")
         return True
         
     except Exception as e:
-        print(f"\n[ERROR] Video download failed: {e}")
+        report_error("Video download failed", e)
         return False
 
-def download_audio(url, output_dir):
-    """Download audio and convert to MP3"""
+def print_conversion(result, job=None, events=None):
+    """Report a finished audio conversion and the route it took"""
+    if events:
+        events.emit('postprocess_end', job=job, postprocessor='transcode', path=result['path'],
+                    ok=result['ok'], output=result['output'], error=result['error'])
+    if result['ok']:
+        print(f"[SUCCESS] Audio saved ({PATH_LABELS[result['path']]}): {result['output']}")
+    else:
+        print(f"[WARNING] {result['error']} Keeping original audio file.")
+
+def download_audio(url, output_dir, wait=True, audio_format=DEFAULT_AUDIO_FORMAT, info=None):
+    """
+    Download audio and convert to audio_format (MP3 by default). The
+    conversion runs on the shared transcode pool and is skipped or
+    replaced by a remux when the downloaded codec already fits; with
+    wait=False this returns as soon as the download is done and the
+    conversion Futures are added to current_conversions(), which the
+    caller waits on and checks before exiting. A failed conversion counts
+    as a failed download. info is test_url's result, if any.
+    """
     try:
         print("[INFO] Starting audio download...")
         
         ydl_opts = {
             'format': 'bestaudio/best',
             'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
-            'progress_hooks': [progress_hook],
+            'progress_hooks': [progress_hook()],
+            # The board draws progress; yt-dlp's own '\r' printer would pile up in it
+            'noprogress': True,
             'ignoreerrors': True,
+            **ydl_event_options(),
         }
         
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+            info = extract_and_download(ydl, url, info)
+        
+        # One file for a video, one per entry for a playlist
+        downloads = downloaded_files(info)
+        if not downloads:
+            print("[ERROR] Audio download failed: downloaded file not found")
+            return False
+        
+        job, events = current_job(), current_events()
+        for source, entry in downloads:
+            print(f"[INFO] Preparing {audio_format} from {entry.get('acodec')}: {os.path.basename(source)}")
+            if events:
+                events.emit('postprocess_start', job=job, postprocessor='transcode', filename=source,
+                            source_codec=entry.get('acodec'), audio_format=audio_format)
+        conversions = get_transcode_pool().submit_downloads(downloads, '192',
+                                                            on_done=lambda result: print_conversion(result, job, events),
+                                                            audio_format=audio_format)
+        if wait:
+            if not all([conversion.result()['ok'] for conversion in conversions]):
+                print("[ERROR] Audio conversion failed")
+                return False
+        elif current_conversions() is not None:
+            current_conversions().extend((job, conversion) for conversion in conversions)
         
-        print(f"\n[SUCCESS] Audio download completed!")
+        print(f"[SUCCESS] Audio download completed!")
         return True
         
     except Exception as e:
-        print(f"\n[ERROR] Audio download failed: {e}")
+        report_error("Audio download failed", e)
         return False
 
-def download_playlist(url, output_dir):
-    """Download playlist"""
+def download_playlist(url, output_dir, workers=DEFAULT_PLAYLIST_WORKERS, sync=False, info=None):
+    """Download playlist, several videos at a time, skipping archived ones"""
     try:
         print("[INFO] Starting playlist download...")
         
         ydl_opts = {
             'format': 'best[height<=720]',
             'outtmpl': os.path.join(output_dir, '%(playlist_title)s/%(title)s.%(ext)s'),
-            'progress_hooks': [progress_hook],
-            'ignoreerrors': True,
+            **ydl_event_options(),
         }
         
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
+        summary_line = object()
+        job, events = current_job(), current_events()
+        last_event = [0.0]
         
-        print(f"\n[SUCCESS] Playlist download completed!")
-        return True
+        def print_summary(summary):
+            # Entry progress arrives from every worker; one event a second is plenty
+            if events and (time.monotonic() - last_event[0] >= 1.0 or not summary['listing']):
+                last_event[0] = time.monotonic()
+                events.emit('playlist_progress', job=job, **summary)
+            total = f"{summary['total']}+" if summary['listing'] else summary['total']
+            board.set(summary_line, f"[INFO] Playlist progress: {summary['percent']:.1f}% "
+                                    f"({summary['completed']}/{total} done, {summary['active']} active, "
+                                    f"{summary['failed']} failed)")
+        
+        def print_item(result):
+            if events:
+                events.emit('item', job=job, **result)
+            if result['status'] == 'completed':
+                print(f"[SUCCESS] ({result['index']}) {result['title']}")
+            else:
+                print(f"[ERROR] ({result['index']}) {result['title']}: {result['error']}")
+        
+        archive = get_archive(output_dir)
+        if len(archive):
+            print(f"[INFO] {len(archive)} videos already in the archive will be skipped")
+        
+        downloader = PlaylistDownloader(ydl_opts, max_workers=workers, on_progress=print_summary, on_item=print_item,
+                                        archive=archive, sync=sync)
+        try:
+            results = downloader.run(url, info)
+        finally:
+            board.remove(summary_line)
+        
+        failed = sum(1 for result in results if result['status'] == 'error')
+        print(f"[SUCCESS] Playlist download completed!")
+        print(f"[INFO] Successfully downloaded: {len(results) - failed}/{len(results)} videos")
+        print(f"[INFO] Skipped (already archived): {downloader.summary()['skipped']}")
+        return failed == 0
         
     except Exception as e:
-        print(f"\n[ERROR] Playlist download failed: {e}")
+        report_error("Playlist download failed", e)
         return False
 
-def main():
+def run_download(url, download_type, output_dir, info=None, job=None, events=None, conversions=None):
+    """
+    Dispatch one download by menu type; returns True on success.
+    With a conversions list, audio conversions are left running on the
+    transcode pool and their Futures collected there.
+    """
+    _job.id = job if job is not None else url
+    _job.events = events
+    _job.conversions = conversions
+    started = time.monotonic()
+    if events:
+        events.emit('job_start', job=_job.id, url=url, type=download_type, output=output_dir)
+    success = False
+    try:
+        with board:
+            success = _dispatch(url, download_type, output_dir, info)
+        return success
+    finally:
+        if events:
+            events.emit('job_end', job=_job.id, url=url, ok=success, elapsed=round(time.monotonic() - started, 3))
+        _job.id = _job.events = _job.conversions = None
+
+def _dispatch(url, download_type, output_dir, info):
+    if download_type == "video_best":
+        return download_video(url, output_dir, "best", info=info)
+    elif download_type == "video_720":
+        return download_video(url, output_dir, "720", info=info)
+    elif download_type == "video_480":
+        return download_video(url, output_dir, "480", info=info)
+    elif download_type == "audio":
+        # In a batch the worker moves on while ffmpeg runs
+        return download_audio(url, output_dir, wait=current_conversions() is None, info=info)
+    elif download_type == "playlist":
+        return download_playlist(url, output_dir, info=info)
+    elif download_type == "playlist_sync":
+        return download_playlist(url, output_dir, sync=True, info=info)
+    return False
+
+def read_urls(source):
+    """URLs from a file, or stdin for '-'; blank lines and # comments are skipped"""
+    f = sys.stdin if source == "-" else open(source, encoding='utf-8')
+    try:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith('#')]
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Download YouTube videos with yt-dlp. "
+                                     "Without URLs or --file the interactive menu starts.")
+    parser.add_argument("urls", nargs="*", help="URLs to download")
+    parser.add_argument("-f", "--file", help="read URLs from a file, one per line ('-' for stdin)")
+    parser.add_argument("-t", "--type", default="video_best", choices=DOWNLOAD_TYPES, help="download type")
+    parser.add_argument("-o", "--output", default=os.getcwd(), help="output directory")
+    parser.add_argument("-j", "--workers", type=int, default=DEFAULT_MAX_WORKERS,
+                        help="URLs downloaded at the same time")
+    parser.add_argument("--json", action="store_true",
+                        help="write one JSON event per line to stdout; text output moves to stderr")
+    return parser.parse_args(argv)
+
+def run_batch(urls, download_type, output_dir, workers=DEFAULT_MAX_WORKERS, events=None):
+    """
+    Download every URL on a bounded pool without prompting.
+    Returns the process exit code: 0 when all succeeded, 1 otherwise.
+    events is a JsonEvents that receives the batch's events.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    print(f"[INFO] Batch: {len(urls)} URLs, type {download_type}, {workers} workers -> {output_dir}")
+    
+    if events:
+        events.emit('batch_start', urls=len(urls), type=download_type, workers=workers, output=output_dir)
+    
+    def run(job, url):
+        try:
+            return run_download(url, download_type, output_dir, job=job, events=events, conversions=conversions)
+        except Exception as e:
+            print(f"[ERROR] {url}: {e}")
+            if events:
+                events.error(job, e)
+            return False
+    
+    # Audio conversions finish on the transcode pool after their download worker moved on
+    conversions = []
+    with board:
+        with ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+            results = list(pool.map(run, range(1, len(urls) + 1), urls))
+        if conversions:
+            print(f"[INFO] Waiting for {len(conversions)} audio conversion(s)...")
+            wait_all([conversion for _, conversion in conversions])
+    
+    # A job whose audio did not convert failed, even though its download went through
+    for job, conversion in conversions:
+        result = conversion.result()
+        if not result['ok'] and results[job - 1]:
+            results[job - 1] = False
+            if events:
+                events.error(job, result['error'])
+    
+    failed = [url for url, success in zip(urls, results) if not success]
+    if events:
+        events.emit('batch_end', succeeded=len(urls) - len(failed), failed=len(failed))
+    print(f"\n[INFO] Batch finished: {len(urls) - len(failed)}/{len(urls)} succeeded, {len(failed)} failed")
+    for url in failed:
+        print(f"[ERROR] Failed: {url}")
+    return 1 if failed else 0
+
+def main(argv=None):
+    args = parse_args(argv)
+    startup_timing.mark_ready("cli_ytdlp_works")
+    if args.urls or args.file:
+        urls = list(args.urls)
+        if args.file:
+            urls += read_urls(args.file)
+        if not urls:
+            print("[ERROR] No URLs to download")
+            return 2
+        if not args.json:
+            return run_batch(urls, args.type, args.output, args.workers)
+        with JsonEvents() as events:
+            return run_batch(urls, args.type, args.output, args.workers, events)
+    
     print_banner()
     
     while True:
@@ -196,23 +463,14 @@ def main():
             if not params:
                 continue
             
-            # Test URL first
-            if not test_url(params['url']):
+            # Test URL first; its extraction is reused for the download
+            info = test_url(params['url'])
+            if info is None:
                 print("\n[ERROR] Invalid URL. Please try again.")
                 continue
             
             # Perform download based on type
-            success = False
-            if params['type'] == "video_best":
-                success = download_video(params['url'], params['output'], "best")
-            elif params['type'] == "video_720":
-                success = download_video(params['url'], params['output'], "720")
-            elif params['type'] == "video_480":
-                success = download_video(params['url'], params['output'], "480")
-            elif params['type'] == "audio":
-                success = download_audio(params['url'], params['output'])
-            elif params['type'] == "playlist":
-                success = download_playlist(params['url'], params['output'])
+            success = run_download(params['url'], params['type'], params['output'], info)
             
             if success:
                 print("\n[SUCCESS] Download completed successfully!")
@@ -232,6 +490,7 @@ def main():
         except Exception as e:
             print(f"\n[ERROR] Unexpected error: {e}")
             print("Please try again.")
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    sys.exit(main()) 
\ No newline at end of file
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Download archive
+Remembers which videos were already downloaded into an output folder.
+Uses yt-dlp's --download-archive file format ("youtube <video id>" per line)
+"""
+
+import os
+import threading
+
+ARCHIVE_FILENAME = '.ytdl_archive.txt'
+
+_archives = {}
+_archives_lock = threading.Lock()
+
+def archive_key(entry):
+    """Archive line for a playlist entry or info dict, or None without an id"""
+    video_id = entry.get('id')
+    if not video_id:
+        return None
+    extractor = entry.get('ie_key') or entry.get('extractor_key') or 'Youtube'
+    return f"{extractor.lower()} {video_id}"
+
+def get_archive(output_dir):
+    """Shared archive for an output folder, so concurrent jobs see each other's writes"""
+    path = os.path.abspath(os.path.join(output_dir, ARCHIVE_FILENAME))
+    with _archives_lock:
+        if path not in _archives:
+            _archives[path] = DownloadArchive(path)
+        return _archives[path]
+
+class DownloadArchive:
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._keys = set()
+        if os.path.exists(path):
+            with open(path, encoding='utf-8') as f:
+                self._keys = {line.strip() for line in f if line.strip()}
+
+    def __contains__(self, key):
+        return key is not None and key in self._keys
+
+    def __len__(self):
+        return len(self._keys)
+
+    def add(self, key):
+        """Record a finished download; appends one line to the archive file"""
+        if key is None:
+            return
+        with self._lock:
+            if key in self._keys:
+                return
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(key + '\n')
+            self._keys.add(key)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Video metadata cache
+Keeps raw yt-dlp extraction results so a URL test followed by a download
+only pays for extraction once
+"""
+
+import copy
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = int(os.environ.get('YTDL_INFO_CACHE_SIZE', '256'))
+
+# Stream URLs inside the info expire after a few hours, keep well below that
+DEFAULT_TTL = float(os.environ.get('YTDL_INFO_CACHE_TTL', '600'))
+
+VIDEO_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
+
+def video_key(url):
+    """Canonical cache key: the YouTube video ID, or the URL itself"""
+    url = url.strip()
+    # A watch URL inside a playlist downloads the playlist, keep those apart
+    if 'list=' not in url:
+        match = VIDEO_ID_RE.search(url)
+        if match:
+            return f"youtube:{match.group(1)}"
+    return url
+
+class InfoCache:
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, url):
+        """Return a private copy of the cached info, or None"""
+        key = video_key(url)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and time.monotonic() - entry[0] <= self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                info = entry[1]
+            else:
+                if entry:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+        # process_ie_result mutates the dict it is given
+        return copy.deepcopy(info)
+
+    def put(self, url, info):
+        """Cache a single-video result; playlists hold lazy entries and are skipped"""
+        if not info or info.get('_type', 'video') != 'video':
+            return
+        key = video_key(url)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), copy.deepcopy(info))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def extract(self, ydl, url):
+        """Raw (unprocessed) info for url, extracted with ydl on a cache miss"""
+        info = self.get(url)
+        if info is None:
+            info = ydl.extract_info(url, download=False, process=False)
+            if info is None:
+                raise ValueError(f"Could not extract video information for {url}")
+            self.put(url, info)
+        return info
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
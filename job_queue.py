@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Bounded download queue
+Runs submitted jobs on a pool of worker threads, in submission order;
+the concurrency limit can be changed while jobs are running
+"""
+
+import itertools
+import os
+import queue
+import threading
+
+# Number of downloads allowed to run at the same time
+DEFAULT_MAX_WORKERS = int(os.environ.get('YTDL_MAX_CONCURRENT', '3'))
+
+class DownloadQueue:
+    def __init__(self, handler, max_workers=DEFAULT_MAX_WORKERS, name="download"):
+        self.handler = handler
+        self.max_workers = max(1, int(max_workers))
+        self.name = name
+        self._jobs = queue.Queue()
+        self._lock = threading.Lock()
+        # Workers wait here for a free slot and for their job's turn
+        self._turn = threading.Condition(self._lock)
+        self._tickets = itertools.count()
+        self._next_ticket = 0
+        self._active = set()
+        self._submitted = 0
+        self._finished = 0
+        self._workers = []
+
+        with self._lock:
+            self._add_workers()
+
+    def _add_workers(self):
+        while len(self._workers) < self.max_workers:
+            worker = threading.Thread(target=self._worker, name=f"{self.name}-worker-{len(self._workers) + 1}",
+                                      daemon=True)
+            worker.start()
+            self._workers.append(worker)
+
+    def set_max_workers(self, max_workers):
+        """
+        Change how many jobs may run at once. Raising it starts waiting
+        jobs right away; lowering it lets running jobs finish first.
+        """
+        with self._turn:
+            self.max_workers = max(1, int(max_workers))
+            self._add_workers()
+            self._turn.notify_all()
+
+    def submit(self, job_id, *args):
+        """Queue a job and return how many jobs are waiting"""
+        with self._lock:
+            self._submitted += 1
+            self._jobs.put((next(self._tickets), job_id, args))
+        return self._jobs.qsize()
+
+    def _worker(self):
+        """Take jobs off the queue until the process exits"""
+        while True:
+            ticket, job_id, args = self._jobs.get()
+            with self._turn:
+                # Workers can outnumber the limit after it was lowered
+                while ticket != self._next_ticket or len(self._active) >= self.max_workers:
+                    self._turn.wait()
+                self._next_ticket += 1
+                self._active.add(job_id)
+                self._turn.notify_all()
+            try:
+                self.handler(job_id, *args)
+            except Exception as e:
+                print(f"[ERROR] {self.name} job {job_id} crashed: {e}")
+            finally:
+                with self._turn:
+                    self._active.discard(job_id)
+                    self._finished += 1
+                    self._turn.notify_all()
+                self._jobs.task_done()
+
+    def stats(self):
+        """Snapshot of queue depth and worker usage"""
+        with self._lock:
+            return {
+                'max_workers': self.max_workers,
+                'active': len(self._active),
+                'active_ids': sorted(self._active),
+                'queued': self._submitted - self._finished - len(self._active),
+                'submitted': self._submitted,
+                'finished': self._finished,
+            }
+
+    def join(self):
+        """Block until every queued job has finished"""
+        self._jobs.join()
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+"""
+Persistent job store for the web downloaders
+Keeps download jobs in SQLite so they survive a server restart
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_DB_DIR = os.path.join(os.path.expanduser('~'), '.ytdownloader')
+
+def default_db_path(app):
+    """
+    Database for one app, so two servers never resume each other's jobs.
+    YTDL_JOB_DB overrides it; give each running server its own file.
+    """
+    return os.environ.get('YTDL_JOB_DB') or os.path.join(DEFAULT_DB_DIR, f'{app}-jobs.db')
+
+# Seconds between batched progress writes
+FLUSH_INTERVAL = 1.0
+
+# Jobs in these states are requeued on startup
+RESUMABLE_STATES = ('queued', 'starting', 'downloading', 'processing')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS jobs (
+    download_id TEXT PRIMARY KEY,
+    url TEXT NOT NULL,
+    download_type TEXT NOT NULL,
+    quality TEXT,
+    output_dir TEXT,
+    status TEXT NOT NULL,
+    progress REAL NOT NULL DEFAULT 0,
+    message TEXT,
+    error TEXT,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL
+)
+'''
+
+class JobStore:
+    def __init__(self, path, flush_interval=FLUSH_INTERVAL):
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(SCHEMA)
+        self._conn.commit()
+
+        self._stop = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_loop, name="job-store-flush", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def create(self, download_id, url, download_type, quality, output_dir, entry):
+        """Save a new (or requeued) job right away"""
+        now = time.time()
+        with self._lock:
+            self._pending.pop(download_id, None)
+            self._conn.execute('''
+                INSERT INTO jobs (download_id, url, download_type, quality, output_dir,
+                                  status, progress, message, error, created_at, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(download_id) DO UPDATE SET
+                    status = excluded.status,
+                    progress = excluded.progress,
+                    message = excluded.message,
+                    error = excluded.error,
+                    updated_at = excluded.updated_at
+            ''', (download_id, url, download_type, quality, output_dir,
+                  entry['status'], entry['progress'], entry['message'], entry['error'], now, now))
+            self._conn.commit()
+
+    def update(self, download_id, entry, immediate=False):
+        """Record a status change; progress-only changes are written in batches"""
+        with self._lock:
+            self._pending[download_id] = (entry['status'], entry['progress'], entry['message'],
+                                          entry['error'], time.time(), download_id)
+            if immediate:
+                self._flush_locked()
+
+    def delete(self, download_ids):
+        with self._lock:
+            for download_id in download_ids:
+                self._pending.pop(download_id, None)
+            self._conn.executemany('DELETE FROM jobs WHERE download_id = ?',
+                                   [(download_id,) for download_id in download_ids])
+            self._conn.commit()
+
+    def load_jobs(self):
+        """Return every saved job, oldest first"""
+        self.flush()
+        with self._lock:
+            cursor = self._conn.execute('''
+                SELECT download_id, url, download_type, quality, output_dir,
+                       status, progress, message, error, created_at, updated_at
+                FROM jobs ORDER BY created_at
+            ''')
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def flush(self):
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        rows = list(self._pending.values())
+        self._pending.clear()
+        self._conn.executemany('''
+            UPDATE jobs SET status = ?, progress = ?, message = ?, error = ?, updated_at = ?
+            WHERE download_id = ?
+        ''', rows)
+        self._conn.commit()
+
+    def _flush_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            try:
+                self.flush()
+            except sqlite3.Error as e:
+                print(f"[ERROR] Failed to save job progress: {e}")
+
+    def close(self):
+        if self._stop.is_set():
+            return
+        self._stop.set()
+        self.flush()
+        with self._lock:
+            self._conn.close()
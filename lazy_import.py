@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+"""
+Deferred imports
+yt-dlp and pytube account for most of the startup time; modules bind them
+with lazy_module() so the import only happens on first attribute access,
+after the window, prompt or server is already up
+"""
+
+import importlib
+import threading
+
+class LazyModule:
+    def __init__(self, name):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self._lock:
+                module = self.__dict__['_module']
+                if module is None:
+                    module = importlib.import_module(self._name)
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
+
+def lazy_module(name):
+    """Stand-in for `import name` that imports on first use"""
+    return LazyModule(name)
@@ -1,9 +1,16 @@
+import startup_timing
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from pytube import YouTube, Playlist
+from lazy_import import lazy_module
 import os
 import threading
-import subprocess
+from functools import partial
+from progress_reporter import ProgressReporter
+from tk_support import LogView, Spinner, UiQueue, VideoCache, log_conversion, stream_audio
+from audio_transcode import get_transcode_pool, STREAM_TRANSCODE
+
+# Imported on first use so the window comes up without waiting for it
+pytube = lazy_module('pytube')
 
 class YouTubeDownloaderApp:
     def __init__(self, master):
@@ -16,31 +23,25 @@ class YouTubeDownloaderApp:
         self.resolution = tk.StringVar(value="720p")
         self.streams = []
         self.progress = tk.DoubleVar()
+        # Worker threads update widgets only through this queue
+        self.ui = UiQueue(self.master)
+        self.progress_reporter = ProgressReporter(self.show_progress)
+        # Reused between Fetch Options and Download
+        self.video_cache = VideoCache(
+            lambda url: pytube.YouTube(url, on_progress_callback=self.progress_reporter.pytube_callback))
         self.current_download_title = ""
-        self.spinner_running = False
         self.spinner_label = tk.Label(self.master, text="", font=("Courier", 12))
         self.spinner_label.pack()
+        self.spinner = Spinner(self.spinner_label)
 
         self.create_widgets()
 
     # spinner start 
     def start_spinner(self, message="Processing"):
-        self.spinner_running = True
-        threading.Thread(target=self.animate_spinner, args=(message,), daemon=True).start()
+        self.ui.call(self.spinner.start, message)
 
     def stop_spinner(self):
-        self.spinner_running = False
-        self.spinner_label.config(text="")  # Clear
-
-    def animate_spinner(self, message):
-        frames = ['⠋','⠙','⠹','⠸','⠼','⠴','⠦','⠧','⠇','⠏']
-        i = 0
-        while self.spinner_running:
-            frame = frames[i % len(frames)]
-            self.spinner_label.config(text=f"{frame} {message}")
-            i += 1
-            self.master.update_idletasks()
-            self.master.after(100)  # 10fps
+        self.ui.call(self.spinner.stop)
     # spinner end
     
     def create_widgets(self):
@@ -71,12 +72,17 @@ class YouTubeDownloaderApp:
 
         self.log_text = tk.Text(self.master, height=10, state='disabled')
         self.log_text.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.log_view = LogView(self.log_text, self.ui)
+
+    def show_resolutions(self, resolutions):
+        self.res_combo['values'] = resolutions
+        self.res_combo.set("720p" if "720p" in resolutions else resolutions[0] if resolutions else "720p")
 
     def log(self, message):
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state='disabled')
+        self.log_view.write(message)
+
+    def set_progress(self, value):
+        self.ui.latest('progress', self.progress.set, value)
 
     def update_type(self):
         if self.download_type.get() == "video":
@@ -93,11 +99,8 @@ class YouTubeDownloaderApp:
 
 
 
-    def on_progress(self, stream, chunk, bytes_remaining):
-        total = stream.filesize
-        downloaded = total - bytes_remaining
-        percent = downloaded / total * 100
-        self.progress.set(percent)
+    def show_progress(self, record):
+        self.set_progress(record.percent)
 
     def load_streams(self):
         url = self.video_url.get()
@@ -107,12 +110,11 @@ class YouTubeDownloaderApp:
 
         self.log("[INFO] Fetching available streams...")
         if self.download_type.get() == "video":
-            yt = YouTube(url)
+            yt = self.video_cache.get(url)
             streams = yt.streams.filter(progressive=True, file_extension='mp4').order_by('resolution').desc()
             self.streams = list(streams)
             resolutions = sorted(set(s.resolution for s in streams if s.resolution))
-            self.res_combo['values'] = resolutions
-            self.res_combo.set("720p" if "720p" in resolutions else resolutions[0])
+            self.ui.call(self.show_resolutions, resolutions)
             self.log(f"[INFO] Found resolutions: {resolutions}")
 
     def start_download_thread(self):
@@ -122,11 +124,11 @@ class YouTubeDownloaderApp:
         try:
             url = self.video_url.get()
             output = self.output_path.get()
-            self.progress.set(0)
+            self.set_progress(0)
             self.start_spinner("Downloading...")
 
             if self.download_type.get() == "video":
-                yt = YouTube(url, on_progress_callback=self.on_progress)
+                yt = self.video_cache.get(url)
                 stream = yt.streams.filter(progressive=True, file_extension='mp4', res=self.resolution.get()).first()
                 if stream:
                     self.log(f"[INFO] Downloading video: {yt.title}")
@@ -134,19 +136,19 @@ class YouTubeDownloaderApp:
                     self.log("[SUCCESS] Video downloaded.")
 
             elif self.download_type.get() == "audio":
-                yt = YouTube(url, on_progress_callback=self.on_progress)
+                yt = self.video_cache.get(url)
                 stream = yt.streams.filter(only_audio=True).first()
                 self.log(f"[INFO] Downloading audio: {yt.title}")
-                out_file = stream.download(output_path=output)
-                mp3_file = os.path.splitext(out_file)[0] + ".mp3"
-                self.log(f"[INFO] Converting to MP3...")
-                self.start_spinner("Converting to MP3...")
-                subprocess.run(["ffmpeg", "-y", "-i", out_file, mp3_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                os.remove(out_file)
-                self.log(f"[SUCCESS] MP3 saved: {mp3_file}")
+                streamed = STREAM_TRANSCODE and stream_audio(self.log, stream, output, pytube.request.stream,
+                                                             self.progress_reporter)
+                if not streamed:
+                    out_file = stream.download(output_path=output)
+                    # Conversion runs on the transcode pool so the download thread is free
+                    self.log(f"[INFO] Converting to MP3...")
+                    get_transcode_pool().submit(out_file, on_done=partial(log_conversion, self.log))
 
             elif self.download_type.get() == "playlist":
-                pl = Playlist(url)
+                pl = pytube.Playlist(url)
                 self.log(f"[INFO] Downloading playlist: {pl.title}")
                 for video in pl.videos:
                     stream = video.streams.filter(progressive=True, file_extension='mp4').first()
@@ -165,4 +167,5 @@ class YouTubeDownloaderApp:
 if __name__ == '__main__':
     root = tk.Tk()
     app = YouTubeDownloaderApp(root)
+    root.after_idle(startup_timing.mark_ready, "main")
     root.mainloop()
@@ -1,15 +1,29 @@
+import startup_timing
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import yt_dlp
+from lazy_import import lazy_module
 import os
 import threading
-import subprocess
+import itertools
+from progress_reporter import ProgressReporter
+from tk_support import LogView, UiQueue
+from job_queue import DownloadQueue, DEFAULT_MAX_WORKERS
+from cli_progress import format_bytes, format_eta
+from playlist_runner import PlaylistDownloader
+from download_archive import get_archive
+from audio_transcode import PATH_LABELS, DEFAULT_AUDIO_FORMAT, get_transcode_pool, downloaded_files
+
+# Imported on first use so the window comes up without waiting for it
+yt_dlp = lazy_module('yt_dlp')
+
+# Queue view states, in the order a job goes through them
+JOB_STATES = ('queued', 'downloading', 'converting', 'completed', 'failed')
 
 class YouTubeDownloaderApp:
     def __init__(self, master):
         self.master = master
         self.master.title("YouTube Downloader - yt-dlp GUI")
-        self.master.geometry("700x500")
+        self.master.geometry("760x680")
         self.master.configure(bg='#f0f0f0')
         
         # Variables
@@ -18,7 +32,13 @@ class YouTubeDownloaderApp:
         self.download_type = tk.StringVar(value="video")
         self.quality = tk.StringVar(value="720p")
         self.progress = tk.DoubleVar()
-        self.spinner_running = False
+        # Worker threads update widgets only through this queue
+        self.ui = UiQueue(self.master)
+        self.parallel = tk.IntVar(value=DEFAULT_MAX_WORKERS)
+        # job id -> url, type, quality, state, progress; one row each in the queue view
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.queue = DownloadQueue(self.run_job, self.parallel.get(), name="gui")
         
         # Create widgets
         self.create_widgets()
@@ -102,6 +122,32 @@ class YouTubeDownloaderApp:
         tk.Button(action_frame, text="Download", command=self.start_download,
                  font=("Arial", 10, "bold"), bg='#FF5722', fg='white', relief=tk.FLAT, 
                  padx=20, pady=8).pack(side=tk.LEFT)
+        
+        tk.Button(action_frame, text="Clear Finished", command=self.clear_finished,
+                 font=("Arial", 10), bg='#9E9E9E', fg='white', relief=tk.FLAT, 
+                 padx=15, pady=8).pack(side=tk.RIGHT)
+        
+        ttk.Spinbox(action_frame, from_=1, to=16, width=4, textvariable=self.parallel,
+                    command=self.update_parallel, state="readonly").pack(side=tk.RIGHT, padx=(0, 20))
+        tk.Label(action_frame, text="Parallel downloads:", font=("Arial", 10), 
+                bg='#f0f0f0', fg='#333333').pack(side=tk.RIGHT, padx=5)
+
+        # Queue section: one row per download
+        queue_frame = tk.Frame(main_frame, bg='#f0f0f0')
+        queue_frame.pack(fill=tk.BOTH, expand=True, pady=5)
+        
+        columns = ("title", "type", "progress", "speed", "eta", "state")
+        self.queue_view = ttk.Treeview(queue_frame, columns=columns, show="headings", height=6)
+        for column, heading, width in [("title", "Title / URL", 260), ("type", "Type", 60),
+                                       ("progress", "Progress", 80), ("speed", "Speed", 80),
+                                       ("eta", "ETA", 60), ("state", "State", 130)]:
+            self.queue_view.heading(column, text=heading)
+            self.queue_view.column(column, width=width, stretch=(column == "title"))
+        queue_scrollbar = tk.Scrollbar(queue_frame, orient="vertical", command=self.queue_view.yview)
+        self.queue_view.configure(yscrollcommand=queue_scrollbar.set)
+        
+        self.queue_view.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        queue_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Progress section
         progress_frame = tk.Frame(main_frame, bg='#f0f0f0')
@@ -126,13 +172,14 @@ class YouTubeDownloaderApp:
         text_frame = tk.Frame(log_frame, bg='#f0f0f0')
         text_frame.pack(fill=tk.BOTH, expand=True, pady=5)
         
-        self.log_text = tk.Text(text_frame, height=8, state='disabled', 
+        self.log_text = tk.Text(text_frame, height=6, state='disabled', 
                                font=("Consolas", 9), bg='#ffffff', fg='#333333',
                                relief=tk.SOLID, bd=1)
         scrollbar = tk.Scrollbar(text_frame, orient="vertical", command=self.log_text.yview)
         self.log_text.configure(yscrollcommand=scrollbar.set)
         
         self.log_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.log_view = LogView(self.log_text, self.ui)
         scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Initialize quality options
@@ -146,9 +193,9 @@ class YouTubeDownloaderApp:
             self.quality_combo['values'] = ["Best", "1080p", "720p", "480p", "360p"]
             self.quality.set("720p")
         elif self.download_type.get() == "audio":
-            self.quality_combo.configure(state="disabled")
+            self.quality_combo.configure(state="readonly")
             self.quality_label.configure(text="Audio Quality:")
-            self.quality_combo['values'] = ["192k", "128k", "64k"]
+            self.quality_combo['values'] = ["192k", "128k", "64k", "Original"]
             self.quality.set("192k")
         else:  # playlist
             self.quality_combo.configure(state="readonly")
@@ -164,31 +211,77 @@ class YouTubeDownloaderApp:
 
     def log(self, message):
         """Add message to log"""
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state='disabled')
+        self.log_view.write(message)
 
     def update_status(self, message):
         """Update status label"""
-        self.status_label.configure(text=message)
-
-    def progress_hook(self, d):
-        """Progress callback for yt-dlp"""
-        if d['status'] == 'downloading':
-            if 'total_bytes' in d and d['total_bytes']:
-                percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                self.progress.set(percent)
-                self.update_status(f"Downloading... {percent:.1f}%")
-            elif 'downloaded_bytes' in d:
-                self.update_status(f"Downloaded: {d['downloaded_bytes']} bytes")
-        elif d['status'] == 'finished':
-            self.progress.set(100)
-            self.update_status("Download completed!")
+        self.ui.latest('status', self.status_label.configure, {'text': message})
+
+    def update_parallel(self):
+        """Apply the parallel downloads setting to the queue"""
+        self.queue.set_max_workers(self.parallel.get())
+        self.log(f"[INFO] Up to {self.parallel.get()} downloads at a time")
+
+    def update_job(self, job_id, **fields):
+        """Change a job from any thread; its row is redrawn on the next UI tick"""
+        self.jobs[job_id].update(fields)
+        self.ui.latest(('job', job_id), self.show_job, job_id)
+
+    def show_job(self, job_id):
+        """Draw or refresh one row of the queue view"""
+        job = self.jobs.get(job_id)
+        if job is None:
+            # Cleared before its last update was drawn
+            return
+        values = (job['title'] or job['url'], job['type'], f"{job['percent']:.1f}%",
+                  f"{format_bytes(job['speed'])}/s" if job['speed'] else "",
+                  format_eta(job['eta']) if job['state'] == 'downloading' else "",
+                  job['detail'] or job['state'].capitalize())
+        if self.queue_view.exists(str(job_id)):
+            self.queue_view.item(str(job_id), values=values)
+        else:
+            self.queue_view.insert("", tk.END, iid=str(job_id), values=values)
+        self.show_queue_summary()
+
+    def show_queue_summary(self):
+        """Overall bar and status line for every job in the view"""
+        jobs = list(self.jobs.values())
+        counts = {state: 0 for state in JOB_STATES}
+        for job in jobs:
+            counts[job['state']] += 1
+        done = counts['completed'] + counts['failed']
+        self.progress.set(sum(100.0 if job['state'] in ('completed', 'failed') else job['percent']
+                              for job in jobs) / len(jobs) if jobs else 0)
+        self.status_label.configure(
+            text=f"{counts['downloading'] + counts['converting']} running, {counts['queued']} waiting, "
+                 f"{done}/{len(jobs)} finished, {counts['failed']} failed" if jobs else "Ready")
+
+    def clear_finished(self):
+        """Remove completed and failed jobs from the queue view"""
+        for job_id, job in list(self.jobs.items()):
+            if job['state'] in ('completed', 'failed'):
+                del self.jobs[job_id]
+                if self.queue_view.exists(str(job_id)):
+                    self.queue_view.delete(str(job_id))
+        self.show_queue_summary()
+
+    def job_reporter(self, job_id):
+        """ProgressReporter that feeds one job's row"""
+        def show_progress(record):
+            if record.status == 'downloading':
+                fields = {'percent': record.percent if record.total_bytes else 0.0,
+                          'speed': record.speed, 'eta': record.eta}
+                if record.filename and not self.jobs[job_id]['title']:
+                    fields['title'] = os.path.splitext(os.path.basename(record.filename))[0]
+                self.update_job(job_id, **fields)
+            elif record.status == 'finished':
+                self.update_job(job_id, percent=100.0, speed=None, eta=None)
+
+        return ProgressReporter(show_progress)
 
     def test_url(self):
         """Test if URL is valid"""
-        url = self.video_url.get()
+        url = self.video_url.get().strip()
         if not url:
             self.log("[ERROR] URL is empty")
             return
@@ -219,41 +312,54 @@ class YouTubeDownloaderApp:
         threading.Thread(target=test, daemon=True).start()
 
     def start_download(self):
-        """Start download process"""
-        url = self.video_url.get()
-        if not url:
+        """Queue one download per URL in the entry (several can be pasted at once)"""
+        urls = self.video_url.get().split()
+        if not urls:
             self.log("[ERROR] URL is empty")
             return
 
-        self.progress.set(0)
-        self.log("[INFO] Starting download...")
-        self.update_status("Starting download...")
-        
-        threading.Thread(target=self.download, daemon=True).start()
+        download_type = self.download_type.get()
+        quality = self.quality.get()
+        output = self.output_path.get()
+        for url in urls:
+            job_id = next(self.job_ids)
+            self.jobs[job_id] = {
+                'url': url,
+                'type': download_type,
+                'quality': quality,
+                'output': output,
+                'state': 'queued',
+                'title': None,
+                'percent': 0.0,
+                'speed': None,
+                'eta': None,
+                'detail': None,
+            }
+            self.show_job(job_id)
+            self.queue.submit(job_id)
+        self.log(f"[INFO] Queued {len(urls)} {download_type} download(s)")
+        self.video_url.set("")
 
-    def download(self):
-        """Perform the actual download"""
+    def run_job(self, job_id):
+        """Queue worker: perform one queued download"""
+        job = self.jobs[job_id]
+        self.update_job(job_id, state='downloading')
         try:
-            url = self.video_url.get()
-            output = self.output_path.get()
-            download_type = self.download_type.get()
-            quality = self.quality.get()
-
-            if download_type == "video":
-                self.download_video(url, output, quality)
-            elif download_type == "audio":
-                self.download_audio(url, output, quality)
-            elif download_type == "playlist":
-                self.download_playlist(url, output, quality)
+            if job['type'] == "video":
+                self.download_video(job_id, job['url'], job['output'], job['quality'])
+            elif job['type'] == "audio":
+                self.download_audio(job_id, job['url'], job['output'], job['quality'])
+            elif job['type'] == "playlist":
+                self.download_playlist(job_id, job['url'], job['output'], job['quality'])
 
         except Exception as e:
-            self.log(f"[ERROR] Download failed: {e}")
-            self.update_status("Download failed!")
+            self.log(f"[ERROR] ({job_id}) Download failed: {e}")
+            self.update_job(job_id, state='failed', speed=None, detail=f"Failed: {e}")
 
-    def download_video(self, url, output, quality):
+    def download_video(self, job_id, url, output, quality):
         """Download video"""
         try:
-            self.log("[INFO] Starting video download...")
+            self.log(f"[INFO] ({job_id}) Starting video download...")
             
             # Map quality to yt-dlp format
             quality_map = {
@@ -269,24 +375,27 @@ class YouTubeDownloaderApp:
             ydl_opts = {
                 'format': format_spec,
                 'outtmpl': os.path.join(output, '%(title)s.%(ext)s'),
-                'progress_hooks': [self.progress_hook],
+                'progress_hooks': [self.job_reporter(job_id)],
                 'ignoreerrors': True,
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                info = ydl.extract_info(url, download=True)
+            if not info:
+                # ignoreerrors: yt-dlp already logged why
+                raise ValueError("nothing was downloaded")
             
-            self.log("[SUCCESS] Video download completed!")
-            self.update_status("Video download completed!")
+            self.log(f"[SUCCESS] ({job_id}) Video download completed: {info.get('title')}")
+            self.update_job(job_id, state='completed', title=info.get('title'), percent=100.0, speed=None)
             
         except Exception as e:
-            self.log(f"[ERROR] Video download failed: {e}")
-            self.update_status("Video download failed!")
+            self.log(f"[ERROR] ({job_id}) Video download failed: {e}")
+            self.update_job(job_id, state='failed', speed=None, detail=f"Failed: {e}")
 
-    def download_audio(self, url, output, quality):
+    def download_audio(self, job_id, url, output, quality):
         """Download audio and convert to MP3"""
         try:
-            self.log("[INFO] Starting audio download...")
+            self.log(f"[INFO] ({job_id}) Starting audio download...")
             
             # Map quality to bitrate
             quality_map = {
@@ -300,29 +409,53 @@ class YouTubeDownloaderApp:
             ydl_opts = {
                 'format': 'bestaudio/best',
                 'outtmpl': os.path.join(output, '%(title)s.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': bitrate,
-                }],
-                'progress_hooks': [self.progress_hook],
+                'progress_hooks': [self.job_reporter(job_id)],
                 'ignoreerrors': True,
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+                info = ydl.extract_info(url, download=True)
+            
+            # One file for a video, one per entry for a playlist
+            downloads = downloaded_files(info)
+            if not downloads:
+                raise ValueError("downloaded file not found")
             
-            self.log("[SUCCESS] Audio download completed!")
-            self.update_status("Audio download completed!")
+            # Conversion runs on the transcode pool; this queue slot is free again
+            # "Original" keeps whatever codec the site served, remuxed into an audio-only file
+            audio_format = "original" if quality == "Original" else DEFAULT_AUDIO_FORMAT
+            self.log(f"[INFO] ({job_id}) {len(downloads)} audio file(s) downloaded, preparing {audio_format}...")
+            self.update_job(job_id, state='converting', title=info.get('title'), percent=100.0, speed=None,
+                            detail=f"Preparing {audio_format}...")
+            get_transcode_pool().submit_downloads(downloads, bitrate,
+                                                  on_done=lambda result: self.conversion_done(job_id, result),
+                                                  on_all_done=lambda results: self.conversions_done(job_id, results),
+                                                  audio_format=audio_format)
             
         except Exception as e:
-            self.log(f"[ERROR] Audio download failed: {e}")
-            self.update_status("Audio download failed!")
+            self.log(f"[ERROR] ({job_id}) Audio download failed: {e}")
+            self.update_job(job_id, state='failed', speed=None, detail=f"Failed: {e}")
 
-    def download_playlist(self, url, output, quality):
+    def conversion_done(self, job_id, result):
+        """Called from the transcode pool when one audio conversion finishes"""
+        if result['ok']:
+            self.log(f"[SUCCESS] ({job_id}) Audio saved ({PATH_LABELS[result['path']]}): {result['output']}")
+        else:
+            self.log(f"[WARNING] ({job_id}) {result['error']} Keeping original audio file.")
+
+    def conversions_done(self, job_id, results):
+        """Called from the transcode pool once every file of the job is converted"""
+        failed = sum(1 for result in results if not result['ok'])
+        if not failed:
+            self.update_job(job_id, state='completed', detail=None)
+        else:
+            self.update_job(job_id, state='failed',
+                            detail="Conversion failed" if len(results) == 1 else f"{failed}/{len(results)} conversions failed")
+
+    def download_playlist(self, job_id, url, output, quality):
         """Download playlist"""
         try:
-            self.log("[INFO] Starting playlist download...")
+            self.log(f"[INFO] ({job_id}) Starting playlist download...")
             
             quality_map = {
                 "720p": "best[height<=720]",
@@ -335,24 +468,39 @@ class YouTubeDownloaderApp:
             ydl_opts = {
                 'format': format_spec,
                 'outtmpl': os.path.join(output, '%(playlist_title)s/%(title)s.%(ext)s'),
-                'progress_hooks': [self.progress_hook],
-                'ignoreerrors': True,
             }
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
+            def show_summary(summary):
+                total = f"{summary['total']}+" if summary['listing'] else summary['total']
+                self.update_job(job_id, percent=summary['percent'],
+                                detail=f"{summary['completed']}/{total} done, {summary['failed']} failed")
+            
+            def log_item(result):
+                if result['status'] == 'completed':
+                    self.log(f"[SUCCESS] ({job_id}/{result['index']}) {result['title']}")
+                else:
+                    self.log(f"[ERROR] ({job_id}/{result['index']}) {result['title']}: {result['error']}")
+            
+            # Videos already in this folder's archive are skipped without extraction
+            downloader = PlaylistDownloader(ydl_opts, on_progress=show_summary, on_item=log_item,
+                                            archive=get_archive(output))
+            results = downloader.run(url)
             
-            self.log("[SUCCESS] Playlist download completed!")
-            self.update_status("Playlist download completed!")
+            failed = sum(1 for result in results if result['status'] == 'error')
+            self.log(f"[SUCCESS] ({job_id}) Playlist download completed! {len(results) - failed}/{len(results)} videos downloaded, "
+                     f"{downloader.summary()['skipped']} already archived")
+            self.update_job(job_id, state='completed', percent=100.0,
+                            detail=f"Completed: {len(results) - failed}/{len(results)} videos")
             
         except Exception as e:
-            self.log(f"[ERROR] Playlist download failed: {e}")
-            self.update_status("Playlist download failed!")
+            self.log(f"[ERROR] ({job_id}) Playlist download failed: {e}")
+            self.update_job(job_id, state='failed', speed=None, detail=f"Failed: {e}")
 
 def main():
     try:
         root = tk.Tk()
         app = YouTubeDownloaderApp(root)
+        root.after_idle(startup_timing.mark_ready, "main_gui_ytdlp")
         root.mainloop()
     except Exception as e:
         print(f"Error starting application: {e}")
@@ -1,10 +1,17 @@
+import startup_timing
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-from pytube import YouTube, Playlist
+from lazy_import import lazy_module
 import os
 import threading
-import subprocess
+from functools import partial
 import sys
+from progress_reporter import ProgressReporter
+from tk_support import LogView, Spinner, UiQueue, VideoCache, log_conversion, stream_audio
+from audio_transcode import get_transcode_pool, STREAM_TRANSCODE
+
+# Imported on first use so the window comes up without waiting for it
+pytube = lazy_module('pytube')
 
 class YouTubeDownloaderApp:
     def __init__(self, master):
@@ -17,29 +24,23 @@ class YouTubeDownloaderApp:
         self.resolution = tk.StringVar(value="720p")
         self.streams = []
         self.progress = tk.DoubleVar()
-        self.spinner_running = False
+        # Worker threads update widgets only through this queue
+        self.ui = UiQueue(self.master)
+        self.progress_reporter = ProgressReporter(self.show_progress)
+        # Reused between Fetch Options and Download
+        self.video_cache = VideoCache(
+            lambda url: pytube.YouTube(url, on_progress_callback=self.progress_reporter.pytube_callback))
         self.spinner_label = tk.Label(self.master, text="", font=("Courier", 12))
         self.spinner_label.pack()
+        self.spinner = Spinner(self.spinner_label)
 
         self.create_widgets()
 
     def start_spinner(self, message="Processing"):
-        self.spinner_running = True
-        threading.Thread(target=self.animate_spinner, args=(message,), daemon=True).start()
+        self.ui.call(self.spinner.start, message)
 
     def stop_spinner(self):
-        self.spinner_running = False
-        self.spinner_label.config(text="")
-
-    def animate_spinner(self, message):
-        frames = ['⠋','⠙','⠹','⠸','⠼','⠴','⠦','⠧','⠇','⠏']
-        i = 0
-        while self.spinner_running:
-            frame = frames[i % len(frames)]
-            self.spinner_label.config(text=f"{frame} {message}")
-            i += 1
-            self.master.update_idletasks()
-            self.master.after(100)
+        self.ui.call(self.spinner.stop)
     
     def create_widgets(self):
         # URL input
@@ -79,12 +80,17 @@ class YouTubeDownloaderApp:
         # Log area
         self.log_text = tk.Text(self.master, height=10, state='disabled')
         self.log_text.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.log_view = LogView(self.log_text, self.ui)
+
+    def show_resolutions(self, resolutions):
+        self.res_combo['values'] = resolutions
+        self.res_combo.set("720p" if "720p" in resolutions else resolutions[0] if resolutions else "720p")
 
     def log(self, message):
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state='disabled')
+        self.log_view.write(message)
+
+    def set_progress(self, value):
+        self.ui.latest('progress', self.progress.set, value)
 
     def test_url(self):
         """Test if the URL is valid and accessible"""
@@ -98,7 +104,7 @@ class YouTubeDownloaderApp:
         
         def test():
             try:
-                yt = YouTube(url)
+                yt = self.video_cache.get(url)
                 self.log(f"[SUCCESS] URL is valid!")
                 self.log(f"[INFO] Video title: {yt.title}")
                 self.log(f"[INFO] Video length: {yt.length} seconds")
@@ -125,12 +131,9 @@ class YouTubeDownloaderApp:
         if folder:
             self.output_path.set(folder)
 
-    def on_progress(self, stream, chunk, bytes_remaining):
+    def show_progress(self, record):
         try:
-            total = stream.filesize
-            downloaded = total - bytes_remaining
-            percent = downloaded / total * 100
-            self.progress.set(percent)
+            self.set_progress(record.percent)
         except:
             pass
 
@@ -146,12 +149,11 @@ class YouTubeDownloaderApp:
         def fetch():
             try:
                 if self.download_type.get() == "video":
-                    yt = YouTube(url)
+                    yt = self.video_cache.get(url)
                     streams = yt.streams.filter(progressive=True, file_extension='mp4').order_by('resolution').desc()
                     self.streams = list(streams)
                     resolutions = sorted(set(s.resolution for s in streams if s.resolution), reverse=True)
-                    self.res_combo['values'] = resolutions
-                    self.res_combo.set("720p" if "720p" in resolutions else resolutions[0] if resolutions else "720p")
+                    self.ui.call(self.show_resolutions, resolutions)
                     self.log(f"[INFO] Found resolutions: {resolutions}")
                     self.log(f"[INFO] Video title: {yt.title}")
                 
@@ -170,11 +172,11 @@ class YouTubeDownloaderApp:
         try:
             url = self.video_url.get()
             output = self.output_path.get()
-            self.progress.set(0)
+            self.set_progress(0)
             self.start_spinner("Downloading...")
 
             if self.download_type.get() == "video":
-                yt = YouTube(url, on_progress_callback=self.on_progress)
+                yt = self.video_cache.get(url)
                 stream = yt.streams.filter(progressive=True, file_extension='mp4', res=self.resolution.get()).first()
                 if stream:
                     self.log(f"[INFO] Downloading video: {yt.title}")
@@ -184,22 +186,22 @@ class YouTubeDownloaderApp:
                     self.log("[ERROR] No suitable stream found for the selected resolution.")
 
             elif self.download_type.get() == "audio":
-                yt = YouTube(url, on_progress_callback=self.on_progress)
+                yt = self.video_cache.get(url)
                 stream = yt.streams.filter(only_audio=True).first()
                 if stream:
                     self.log(f"[INFO] Downloading audio: {yt.title}")
-                    out_file = stream.download(output_path=output)
-                    mp3_file = os.path.splitext(out_file)[0] + ".mp3"
-                    self.log(f"[INFO] Converting to MP3...")
-                    self.start_spinner("Converting to MP3...")
-                    subprocess.run(["ffmpeg", "-y", "-i", out_file, mp3_file], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-                    os.remove(out_file)
-                    self.log(f"[SUCCESS] MP3 saved: {mp3_file}")
+                    streamed = STREAM_TRANSCODE and stream_audio(self.log, stream, output, pytube.request.stream,
+                                                                 self.progress_reporter)
+                    if not streamed:
+                        out_file = stream.download(output_path=output)
+                        # Conversion runs on the transcode pool so the download thread is free
+                        self.log(f"[INFO] Converting to MP3...")
+                        get_transcode_pool().submit(out_file, on_done=partial(log_conversion, self.log))
                 else:
                     self.log("[ERROR] No audio stream found.")
 
             elif self.download_type.get() == "playlist":
-                pl = Playlist(url)
+                pl = pytube.Playlist(url)
                 self.log(f"[INFO] Downloading playlist: {pl.title}")
                 for video in pl.videos:
                     stream = video.streams.filter(progressive=True, file_extension='mp4').first()
@@ -219,6 +221,7 @@ if __name__ == '__main__':
     try:
         root = tk.Tk()
         app = YouTubeDownloaderApp(root)
+        root.after_idle(startup_timing.mark_ready, "main_simple")
         root.mainloop()
     except Exception as e:
         print(f"Error starting application: {e}")
@@ -1,12 +1,20 @@
+import startup_timing
 import tkinter as tk
 from tkinter import filedialog, messagebox, ttk
-import yt_dlp
+from lazy_import import lazy_module
 import os
 import threading
-import subprocess
+from functools import partial
+from progress_reporter import ProgressReporter
+from tk_support import LogView, Spinner, UiQueue, log_conversion
+from info_cache import InfoCache
+from audio_transcode import DEFAULT_AUDIO_FORMAT, get_transcode_pool, downloaded_files
 import urllib.request
 import socket
 
+# Imported on first use so the window comes up without waiting for it
+yt_dlp = lazy_module('yt_dlp')
+
 class YouTubeDownloaderApp:
     def __init__(self, master):
         self.master = master
@@ -17,32 +25,24 @@ class YouTubeDownloaderApp:
         self.download_type = tk.StringVar(value="video")
         self.resolution = tk.StringVar(value="720p")
         self.formats = []
+        self.info_cache = InfoCache(max_entries=8)
         self.progress = tk.DoubleVar()
+        # Worker threads update widgets only through this queue
+        self.ui = UiQueue(self.master)
+        self.progress_reporter = ProgressReporter(self.show_progress)
         self.current_download_title = ""
-        self.spinner_running = False
         self.spinner_label = tk.Label(self.master, text="", font=("Courier", 12))
         self.spinner_label.pack()
+        self.spinner = Spinner(self.spinner_label)
 
         self.create_widgets()
 
     # spinner start 
     def start_spinner(self, message="Processing"):
-        self.spinner_running = True
-        threading.Thread(target=self.animate_spinner, args=(message,), daemon=True).start()
+        self.ui.call(self.spinner.start, message)
 
     def stop_spinner(self):
-        self.spinner_running = False
-        self.spinner_label.config(text="")  # Clear
-
-    def animate_spinner(self, message):
-        frames = ['⠋','⠙','⠹','⠸','⠼','⠴','⠦','⠧','⠇','⠏']
-        i = 0
-        while self.spinner_running:
-            frame = frames[i % len(frames)]
-            self.spinner_label.config(text=f"{frame} {message}")
-            i += 1
-            self.master.update_idletasks()
-            self.master.after(100)  # 10fps
+        self.ui.call(self.spinner.stop)
     # spinner end
     
     def create_widgets(self):
@@ -83,12 +83,17 @@ class YouTubeDownloaderApp:
         # Log area
         self.log_text = tk.Text(self.master, height=12, state='disabled')
         self.log_text.pack(pady=10, fill=tk.BOTH, expand=True)
+        self.log_view = LogView(self.log_text, self.ui)
+
+    def show_resolutions(self, resolutions):
+        self.res_combo['values'] = resolutions
+        self.res_combo.set("720p" if "720p" in resolutions else resolutions[0] if resolutions else "720p")
 
     def log(self, message):
-        self.log_text.configure(state='normal')
-        self.log_text.insert(tk.END, f"{message}\n")
-        self.log_text.see(tk.END)
-        self.log_text.configure(state='disabled')
+        self.log_view.write(message)
+
+    def set_progress(self, value):
+        self.ui.latest('progress', self.progress.set, value)
 
     def test_connection(self):
         """Test internet connectivity and YouTube access"""
@@ -141,13 +146,12 @@ class YouTubeDownloaderApp:
         if folder:
             self.output_path.set(folder)
 
-    def progress_hook(self, d):
-        if d['status'] == 'downloading':
-            if 'total_bytes' in d and d['total_bytes']:
-                percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                self.progress.set(percent)
-        elif d['status'] == 'finished':
-            self.progress.set(100)
+    def show_progress(self, record):
+        if record.status == 'downloading':
+            if record.total_bytes:
+                self.set_progress(record.percent)
+        elif record.status == 'finished':
+            self.set_progress(100)
 
     def load_formats(self):
         url = self.video_url.get()
@@ -167,13 +171,14 @@ class YouTubeDownloaderApp:
                 }
                 
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                    info = ydl.extract_info(url, download=False)
+                    # Raw info is cached so Download can reuse it without extracting again
+                    info = self.info_cache.extract(ydl, url)
                     
                     if self.download_type.get() == "video":
-                        formats = [f for f in info.get('formats', []) if f.get('vcodec') != 'none' and f.get('acodec') != 'none']
-                        resolutions = sorted(set(f.get('resolution', 'N/A') for f in formats if f.get('resolution')), reverse=True)
-                        self.res_combo['values'] = resolutions
-                        self.res_combo.set("720p" if "720p" in resolutions else resolutions[0] if resolutions else "720p")
+                        formats = [f for f in info.get('formats', []) if f.get('vcodec') != 'none' and f.get('acodec') != 'none' and f.get('height')]
+                        heights = sorted(set(f['height'] for f in formats), reverse=True)
+                        resolutions = [f"{height}p" for height in heights]
+                        self.ui.call(self.show_resolutions, resolutions)
                         self.log(f"[INFO] Found resolutions: {resolutions}")
                         self.log(f"[INFO] Video title: {info.get('title', 'Unknown')}")
                     
@@ -194,45 +199,50 @@ class YouTubeDownloaderApp:
         try:
             url = self.video_url.get()
             output = self.output_path.get()
-            self.progress.set(0)
+            self.set_progress(0)
             self.start_spinner("Downloading...")
 
             if self.download_type.get() == "video":
                 ydl_opts = {
                     'format': f'best[height<={self.resolution.get().replace("p", "")}]',
                     'outtmpl': os.path.join(output, '%(title)s.%(ext)s'),
-                    'progress_hooks': [self.progress_hook],
+                    'progress_hooks': [self.progress_reporter],
                     'ignoreerrors': True,
                 }
                 
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     self.log("[INFO] Starting video download...")
-                    ydl.download([url])
+                    # Reuses the info from Fetch Options when the URL is unchanged
+                    ydl.process_ie_result(self.info_cache.extract(ydl, url), download=True)
                     self.log("[SUCCESS] Video downloaded.")
 
             elif self.download_type.get() == "audio":
                 ydl_opts = {
                     'format': 'bestaudio/best',
                     'outtmpl': os.path.join(output, '%(title)s.%(ext)s'),
-                    'postprocessors': [{
-                        'key': 'FFmpegExtractAudio',
-                        'preferredcodec': 'mp3',
-                        'preferredquality': '192',
-                    }],
-                    'progress_hooks': [self.progress_hook],
+                    'progress_hooks': [self.progress_reporter],
                     'ignoreerrors': True,
                 }
                 
                 with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                     self.log("[INFO] Starting audio download...")
-                    ydl.download([url])
-                    self.log("[SUCCESS] MP3 downloaded.")
+                    # Reuses the info from Fetch Options when the URL is unchanged
+                    info = ydl.process_ie_result(self.info_cache.extract(ydl, url), download=True)
+                
+                # Conversion runs on the transcode pool so the download thread is free
+                downloads = downloaded_files(info)
+                if downloads:
+                    self.log(f"[INFO] {len(downloads)} audio file(s) downloaded, preparing {DEFAULT_AUDIO_FORMAT}...")
+                    get_transcode_pool().submit_downloads(downloads, '192', on_done=partial(log_conversion, self.log),
+                                                          audio_format=DEFAULT_AUDIO_FORMAT)
+                else:
+                    self.log("[ERROR] Downloaded audio file not found.")
 
             elif self.download_type.get() == "playlist":
                 ydl_opts = {
                     'format': 'best[height<=720]',
                     'outtmpl': os.path.join(output, '%(playlist_title)s/%(title)s.%(ext)s'),
-                    'progress_hooks': [self.progress_hook],
+                    'progress_hooks': [self.progress_reporter],
                     'ignoreerrors': True,
                 }
                 
@@ -252,4 +262,5 @@ class YouTubeDownloaderApp:
 if __name__ == '__main__':
     root = tk.Tk()
     app = YouTubeDownloaderApp(root)
+    root.after_idle(startup_timing.mark_ready, "main_ytdlp_robust")
     root.mainloop() 
\ No newline at end of file
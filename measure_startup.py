@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Cold-start benchmark for every entry point
+Starts each script with YTDL_STARTUP_EXIT=1 so it exits as soon as it is
+ready, and reports wall time (interpreter included) and the in-process
+time printed by startup_timing. GUIs need a display to get that far.
+
+    python measure_startup.py            all entry points, 5 runs each
+    python measure_startup.py -n 10 cli_ytdlp_works.py
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ENTRY_POINTS = [
+    "cli_ytdlp_works.py",
+    "cli_downloader.py",
+    "cli_daemon.py",
+    "web_downloader_works.py",
+    "app_main.py",
+    "main_gui_ytdlp.py",
+    "main_ytdlp.py",
+    "main_ytdlp_robust.py",
+    "main.py",
+    "main_simple.py",
+    "main_pytubefix.py",
+]
+
+TIMING_RE = re.compile(r"\[TIMING\] \S+ ready in (\d+) ms \(heavy imports: ([^)]*)\)")
+
+def measure(script, runs, timeout=60, scratch=None):
+    """(wall ms list, in-process ms list, heavy imports, error)"""
+    env = dict(os.environ, YTDL_STARTUP_EXIT='1')
+    if scratch:
+        # Keep the web apps away from the user's real job database
+        env['YTDL_JOB_DB'] = os.path.join(scratch, 'jobs.db')
+    here = os.path.dirname(os.path.abspath(__file__))
+    walls, readies, heavy = [], [], 'none'
+    for _ in range(runs):
+        started = time.perf_counter()
+        try:
+            result = subprocess.run([sys.executable, script], cwd=here, env=env, stdin=subprocess.DEVNULL,
+                                    stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, timeout=timeout)
+        except subprocess.TimeoutExpired:
+            return walls, readies, heavy, "timed out"
+        walls.append((time.perf_counter() - started) * 1000)
+        match = TIMING_RE.search(result.stderr.decode(errors='replace'))
+        if not match:
+            lines = result.stderr.decode(errors='replace').strip().splitlines()
+            return walls, readies, heavy, lines[-1] if lines else f"exit code {result.returncode}"
+        readies.append(int(match.group(1)))
+        heavy = match.group(2)
+    return walls, readies, heavy, None
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure entry point startup time")
+    parser.add_argument("scripts", nargs="*", default=ENTRY_POINTS, help="entry points to measure")
+    parser.add_argument("-n", "--runs", type=int, default=5, help="runs per entry point")
+    args = parser.parse_args(argv)
+
+    print(f"{'entry point':<26} {'wall ms':>9} {'ready ms':>9}  heavy imports")
+    failed = False
+    with tempfile.TemporaryDirectory(prefix="ytdl-startup-") as scratch:
+        for script in args.scripts:
+            walls, readies, heavy, error = measure(script, args.runs, scratch=scratch)
+            if error:
+                failed = True
+                print(f"{script:<26} {'-':>9} {'-':>9}  [ERROR] {error}")
+                continue
+            print(f"{script:<26} {statistics.median(walls):>9.0f} {statistics.median(readies):>9.0f}  {heavy}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Parallel playlist downloads
+Streams playlist entries page by page into a pool that downloads several at once
+"""
+
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from lazy_import import lazy_module
+
+from progress_reporter import ProgressReporter
+from download_archive import archive_key
+
+yt_dlp = lazy_module('yt_dlp')
+
+# Playlist entries downloaded at the same time
+DEFAULT_PLAYLIST_WORKERS = int(os.environ.get('YTDL_PLAYLIST_WORKERS', '3'))
+
+# In sync mode, stop listing after this many already archived entries in a row
+DEFAULT_SYNC_BREAK = int(os.environ.get('YTDL_SYNC_BREAK', '20'))
+
+# Channel pages list their uploads newest first; ordinary playlists append at the end
+CHANNEL_URL_RE = re.compile(r'youtube\.com/(@[^/?#]+|channel/[^/?#]+|c/[^/?#]+|user/[^/?#]+)(/(videos|shorts|streams))?/?(\?|#|$)')
+
+def newest_first(url, playlist_id=None):
+    """True for listings where new videos come first: channel tabs and 'UU' uploads playlists"""
+    return bool(CHANNEL_URL_RE.search(url)) or (playlist_id or '').startswith('UU')
+
+def entry_url(entry):
+    """Downloadable URL of a flat playlist entry"""
+    url = entry.get('url') or entry.get('webpage_url')
+    if url and url.startswith(('http://', 'https://')):
+        return url
+    return f"https://www.youtube.com/watch?v={entry.get('id') or url}"
+
+def open_playlist(url, info=None):
+    """
+    Return (title, playlist id, entries) where entries is lazy: the
+    playlist pages are only fetched as the caller iterates over it.
+    info may be an unprocessed (process=False) extraction of url that
+    the caller already has.
+    """
+    ydl_opts = {
+        'quiet': True,
+        'no_warnings': True,
+        'extract_flat': 'in_playlist',
+    }
+    ydl = yt_dlp.YoutubeDL(ydl_opts)
+    if info is None:
+        # process=False keeps the extractor's page generator instead of resolving it
+        info = ydl.extract_info(url, download=False, process=False)
+    # Watch URLs with a list= parameter redirect to the playlist itself
+    for _ in range(3):
+        if not info or info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = ydl.extract_info(info['url'], download=False, process=False, ie_key=info.get('ie_key'))
+    if not info:
+        raise ValueError(f"Could not read playlist {url}")
+    if info.get('_type', 'video') == 'video':
+        # A single video: treat it as a one-entry playlist
+        return info.get('title'), None, [info]
+    return info.get('title'), info.get('id'), (entry for entry in info.get('entries') or [] if entry)
+
+class PlaylistDownloader:
+    """
+    Downloads playlist entries on a bounded thread pool.
+
+    on_progress(summary) gets aggregated progress for the whole playlist,
+    on_item(result) is called once per finished entry. While 'listing' is
+    True in the summary, 'total' only counts the entries seen so far.
+
+    With an archive, entries already in it are skipped before they are
+    extracted. On channels and uploads lists, where new videos come
+    first, sync=True also stops listing once sync_break archived entries
+    come in a row. Other playlists grow at the end, so they are always
+    listed in full.
+    """
+
+    def __init__(self, ydl_opts, max_workers=DEFAULT_PLAYLIST_WORKERS, on_progress=None, on_item=None,
+                 archive=None, sync=False, sync_break=DEFAULT_SYNC_BREAK):
+        self.ydl_opts = ydl_opts
+        self.max_workers = max(1, int(max_workers))
+        self.archive = archive
+        self.sync = sync
+        self.sync_break = sync_break
+        self.on_progress = on_progress
+        self.on_item = on_item
+        self._lock = threading.Lock()
+        self._fractions = {}
+        self._total = 0
+        self._listing = False
+        self._completed = 0
+        self._failed = 0
+        self._skipped = 0
+
+    def run(self, url, info=None):
+        """Download every entry while the playlist is still being listed; returns per-entry results"""
+        title, playlist_id, entries = open_playlist(url, info)
+        return self.download_entries(entries, title, playlist_id, newest_first=newest_first(url, playlist_id))
+
+    def download_entries(self, entries, title=None, playlist_id=None, newest_first=False):
+        """
+        Feed entries (any iterable, possibly lazy) to the pool as they
+        arrive. newest_first allows the sync early stop.
+        """
+        stop_early = self.sync and newest_first
+        with self._lock:
+            self._listing = True
+        self._report()
+
+        results = []
+
+        def finished(future):
+            result = future.result()
+            with self._lock:
+                results.append(result)
+            if self.on_item:
+                self.on_item(result)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="playlist") as pool:
+            known_in_a_row = 0
+            try:
+                for index, entry in enumerate(entries, 1):
+                    key = archive_key(entry)
+                    if self.archive is not None and key in self.archive:
+                        with self._lock:
+                            self._skipped += 1
+                        known_in_a_row += 1
+                        if stop_early and known_in_a_row >= self.sync_break:
+                            break
+                        continue
+                    known_in_a_row = 0
+
+                    extra_info = {
+                        'playlist': title,
+                        'playlist_title': title,
+                        'playlist_id': playlist_id,
+                        'playlist_index': index,
+                    }
+                    with self._lock:
+                        self._total += 1
+                    # Results are reported as soon as each entry finishes, even mid-listing
+                    pool.submit(self._download_entry, index, entry, key, extra_info).add_done_callback(finished)
+            finally:
+                with self._lock:
+                    self._listing = False
+                self._report()
+
+        results.sort(key=lambda result: result['index'])
+        return results
+
+    def _download_entry(self, index, entry, key, extra_info):
+        url = entry_url(entry)
+        result = {'index': index, 'url': url, 'title': entry.get('title') or url, 'status': 'completed', 'error': None}
+        reporter = ProgressReporter(lambda record: self._entry_progress(index, record))
+        ydl_opts = dict(self.ydl_opts, progress_hooks=[reporter], ignoreerrors=False, noprogress=True)
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=True, extra_info=extra_info)
+            if info and info.get('title'):
+                result['title'] = info['title']
+            if self.archive is not None:
+                self.archive.add(key or archive_key(info or {}))
+        except Exception as e:
+            result['status'] = 'error'
+            result['error'] = str(e)
+
+        with self._lock:
+            self._fractions.pop(index, None)
+            if result['status'] == 'completed':
+                self._completed += 1
+            else:
+                self._failed += 1
+        self._report()
+        return result
+
+    def _entry_progress(self, index, record):
+        with self._lock:
+            self._fractions[index] = record.percent / 100.0 if record.total_bytes else 0.0
+        self._report()
+
+    def summary(self):
+        """Aggregated progress over all entries"""
+        with self._lock:
+            done = self._completed + self._failed
+            partial = sum(self._fractions.values())
+            return {
+                'total': self._total,
+                'listing': self._listing,
+                'completed': self._completed,
+                'failed': self._failed,
+                'skipped': self._skipped,
+                'active': len(self._fractions),
+                'percent': (done + partial) * 100.0 / self._total if self._total else 0.0,
+            }
+
+    def _report(self):
+        if self.on_progress:
+            self.on_progress(self.summary())
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Throttled progress reporting
+Coalesces yt-dlp / pytube chunk callbacks into a few updates per second
+"""
+
+import time
+
+# Default minimum seconds between two 'downloading' updates
+DEFAULT_INTERVAL = 0.5
+
+class ProgressRecord:
+    """Per-job progress, updated in place instead of rebuilt on every chunk"""
+    __slots__ = ('status', 'downloaded_bytes', 'total_bytes', 'percent', 'speed', 'eta', 'filename')
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.status = 'pending'
+        self.downloaded_bytes = 0
+        self.total_bytes = None
+        self.percent = 0.0
+        self.speed = None
+        self.eta = None
+        self.filename = None
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class ProgressReporter:
+    """
+    Progress hook that only calls `callback(record)` when it is worth it:
+    at most once per `min_interval` seconds, or sooner if the percentage
+    moved by `min_percent`. Status changes ('finished', 'error') always go
+    through.
+    """
+
+    def __init__(self, callback, min_interval=DEFAULT_INTERVAL, min_percent=None):
+        self.callback = callback
+        self.min_interval = min_interval
+        self.min_percent = min_percent
+        self.record = ProgressRecord()
+        self._last_emit = 0.0
+        self._last_percent = 0.0
+
+    def __call__(self, d):
+        """yt-dlp progress hook"""
+        status = d['status']
+        if status == 'downloading':
+            downloaded = d.get('downloaded_bytes') or 0
+            total = d.get('total_bytes') or d.get('total_bytes_estimate')
+            if not self._due(downloaded, total):
+                return
+            record = self.record
+            record.status = status
+            record.downloaded_bytes = downloaded
+            record.total_bytes = total
+            record.percent = downloaded * 100.0 / total if total else 0.0
+            record.speed = d.get('speed')
+            record.eta = d.get('eta')
+            record.filename = d.get('filename')
+            self._emit(record.percent)
+        else:
+            record = self.record
+            record.status = status
+            record.filename = d.get('filename', record.filename)
+            if status == 'finished':
+                record.downloaded_bytes = d.get('downloaded_bytes') or d.get('total_bytes') or record.downloaded_bytes
+                record.total_bytes = d.get('total_bytes') or record.downloaded_bytes
+                record.percent = 100.0
+                record.eta = 0
+            self._emit(record.percent)
+            # The next file (merge part, playlist entry) starts from scratch
+            self._last_emit = 0.0
+            self._last_percent = 0.0
+
+    def pytube_callback(self, stream, chunk, bytes_remaining):
+        """pytube / pytubefix on_progress_callback"""
+        total = stream.filesize
+        downloaded = total - bytes_remaining
+        if bytes_remaining and not self._due(downloaded, total):
+            return
+        record = self.record
+        now = time.monotonic()
+        if record.status == 'downloading' and now > self._last_emit and downloaded > record.downloaded_bytes:
+            record.speed = (downloaded - record.downloaded_bytes) / (now - self._last_emit)
+            record.eta = int(bytes_remaining / record.speed) if record.speed else None
+        record.status = 'downloading' if bytes_remaining else 'finished'
+        record.downloaded_bytes = downloaded
+        record.total_bytes = total
+        record.percent = downloaded * 100.0 / total if total else 0.0
+        record.filename = getattr(stream, 'default_filename', None)
+        self._emit(record.percent)
+
+    def _due(self, downloaded, total):
+        """Cheap check made on every chunk before touching the record"""
+        if time.monotonic() - self._last_emit >= self.min_interval:
+            return True
+        if self.min_percent is not None and total:
+            return downloaded * 100.0 / total - self._last_percent >= self.min_percent
+        return False
+
+    def _emit(self, percent):
+        self._last_emit = time.monotonic()
+        self._last_percent = percent
+        self.callback(self.record)
+
+    def reset(self):
+        self.record.reset()
+        self._last_emit = 0.0
+        self._last_percent = 0.0
@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Startup timing
+Entry points import this first and call mark_ready() once they can
+respond. YTDL_STARTUP_TIMING=1 prints the time in between; with
+YTDL_STARTUP_EXIT=1 the process also exits right there, which is how
+measure_startup.py times cold starts
+"""
+
+import os
+import sys
+import time
+
+STARTED = time.perf_counter()
+
+# Imports that should never happen before an entry point is ready
+HEAVY_MODULES = ('yt_dlp', 'pytube', 'pytubefix')
+
+def mark_ready(name):
+    elapsed = time.perf_counter() - STARTED
+    exit_now = os.environ.get('YTDL_STARTUP_EXIT') == '1'
+    if exit_now or os.environ.get('YTDL_STARTUP_TIMING') == '1':
+        loaded = [module for module in HEAVY_MODULES if module in sys.modules]
+        print(f"[TIMING] {name} ready in {elapsed * 1000:.0f} ms"
+              f" (heavy imports: {', '.join(loaded) or 'none'})", file=sys.stderr, flush=True)
+    if exit_now:
+        sys.stdout.flush()
+        os._exit(0)
+    return elapsed
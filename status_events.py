@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Download status broadcaster
+Pushes status changes to Server-Sent Events subscribers
+"""
+
+import json
+import queue
+import threading
+
+# Updates buffered per client before the oldest ones are dropped
+SUBSCRIBER_BUFFER = 32
+
+# Seconds between keep-alive comments on an idle stream
+KEEPALIVE_INTERVAL = 15
+
+TERMINAL_STATES = ('completed', 'error')
+
+class StatusBroadcaster:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, download_ids=None):
+        """Register a client for some downloads, or for all when download_ids is None"""
+        client = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+        keys = list(download_ids) if download_ids else ['*']
+        with self._lock:
+            for key in keys:
+                self._subscribers.setdefault(key, set()).add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            for key in list(self._subscribers):
+                self._subscribers[key].discard(client)
+                if not self._subscribers[key]:
+                    del self._subscribers[key]
+
+    def publish(self, download_id, status):
+        """Send a status change to every client watching this download"""
+        with self._lock:
+            clients = self._subscribers.get(download_id, set()) | self._subscribers.get('*', set())
+        if not clients:
+            return
+
+        event = (download_id, dict(status))
+        for client in clients:
+            try:
+                client.put_nowait(event)
+            except queue.Full:
+                # Slow client: drop its oldest update, the newest one wins
+                try:
+                    client.get_nowait()
+                except queue.Empty:
+                    pass
+                try:
+                    client.put_nowait(event)
+                except queue.Full:
+                    pass
+
+    def stream(self, download_ids, current_status):
+        """Yield SSE messages for the given downloads until they all finish"""
+        client = self.subscribe(download_ids)
+        pending = set(download_ids)
+        try:
+            # Send what we already know so the client never starts blank
+            for download_id in download_ids:
+                status = current_status(download_id)
+                yield format_event(download_id, status)
+                if status.get('status') in TERMINAL_STATES:
+                    pending.discard(download_id)
+
+            while pending:
+                try:
+                    download_id, status = client.get(timeout=KEEPALIVE_INTERVAL)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+
+                yield format_event(download_id, status)
+                if status.get('status') in TERMINAL_STATES:
+                    pending.discard(download_id)
+        finally:
+            self.unsubscribe(client)
+
+def format_event(download_id, status):
+    """Encode one status update as a Server-Sent Event"""
+    payload = dict(status, download_id=download_id)
+    return f"event: status\ndata: {json.dumps(payload)}\n\n"
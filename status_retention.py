@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Retention policy for finished downloads
+Decides which completed / failed jobs to drop from the status table
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Finished jobs kept in the status table before the least recently used go
+DEFAULT_MAX_FINISHED = int(os.environ.get('YTDL_MAX_FINISHED_JOBS', '500'))
+
+# Seconds a finished job is kept after it completed or failed
+DEFAULT_FINISHED_TTL = float(os.environ.get('YTDL_FINISHED_TTL', str(24 * 60 * 60)))
+
+FINISHED_STATES = ('completed', 'error')
+
+class RetentionPolicy:
+    def __init__(self, max_finished=DEFAULT_MAX_FINISHED, ttl=DEFAULT_FINISHED_TTL):
+        self.max_finished = max_finished
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # download_id -> finished time, least recently used first
+        self._finished = OrderedDict()
+
+    def record(self, download_id, status, finished_at=None):
+        """Track a status change; only finished jobs are eligible for eviction"""
+        with self._lock:
+            if status in FINISHED_STATES:
+                if download_id not in self._finished:
+                    self._finished[download_id] = finished_at or time.time()
+                self._finished.move_to_end(download_id)
+            else:
+                self._finished.pop(download_id, None)
+
+    def touch(self, download_id):
+        """Mark a finished job as recently read"""
+        with self._lock:
+            if download_id in self._finished:
+                self._finished.move_to_end(download_id)
+
+    def evict(self, now=None):
+        """Forget and return the ids that are past their TTL or over the size limit"""
+        now = now or time.time()
+        with self._lock:
+            evicted = []
+            if self.ttl:
+                evicted = [download_id for download_id, finished_at in self._finished.items()
+                           if now - finished_at > self.ttl]
+                for download_id in evicted:
+                    del self._finished[download_id]
+            if self.max_finished is not None:
+                while len(self._finished) > self.max_finished:
+                    download_id, _ = self._finished.popitem(last=False)
+                    evicted.append(download_id)
+            return evicted
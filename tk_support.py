@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Tkinter helpers shared by the GUIs
+Tk widgets may only be touched from the main loop; worker threads hand
+their updates to a UiQueue, which applies them in batches on an after() tick.
+Also the download helpers the pytube / yt-dlp GUIs have in common
+"""
+
+import collections
+import os
+import sys
+import threading
+import time
+
+from audio_transcode import PATH_LABELS, pytube_chunks, stream_to_mp3
+
+# Milliseconds between queue drains
+DRAIN_INTERVAL = 50
+
+# Seconds a fetched pytube video is reused; its stream URLs expire after a few hours
+VIDEO_CACHE_TTL = 600
+
+# Lines kept in a log view; older ones are dropped from the widget
+DEFAULT_LOG_LINES = int(os.environ.get('YTDL_LOG_LINES', '1000'))
+
+# Optional file that receives the full log history, rotated by size
+DEFAULT_LOG_FILE = os.environ.get('YTDL_LOG_FILE') or None
+LOG_FILE_BYTES = int(os.environ.get('YTDL_LOG_FILE_BYTES', str(1024 * 1024)))
+LOG_FILE_BACKUPS = 3
+
+class UiQueue:
+    """
+    Thread-safe channel from worker threads to Tk widgets.
+
+    call(func, *args)          run func on the main loop, in order
+    latest(key, func, *args)   only the newest update per key is applied
+                               each tick (progress bars, status labels)
+    append(key, item, func)    items are collected and func(items) runs
+                               once per tick (log lines)
+    """
+
+    def __init__(self, master, interval=DRAIN_INTERVAL):
+        self.master = master
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._calls = collections.deque()
+        self._latest = {}
+        self._batches = {}
+        self.master.after(self.interval, self._drain)
+
+    def call(self, func, *args):
+        with self._lock:
+            self._calls.append((func, args))
+
+    def latest(self, key, func, *args):
+        with self._lock:
+            self._latest[key] = (func, args)
+
+    def append(self, key, item, func):
+        with self._lock:
+            if key in self._batches:
+                self._batches[key][1].append(item)
+            else:
+                self._batches[key] = (func, [item])
+
+    def _drain(self):
+        with self._lock:
+            calls, self._calls = self._calls, collections.deque()
+            batches, self._batches = self._batches, {}
+            latest, self._latest = self._latest, {}
+        work = [(func, args) for func, args in calls]
+        work += [(func, (items,)) for func, items in batches.values()]
+        work += list(latest.values())
+        for func, args in work:
+            try:
+                func(*args)
+            except Exception:
+                # Same reporting as a failing Tk callback, the rest of the batch still runs
+                self.master.report_callback_exception(*sys.exc_info())
+        self.master.after(self.interval, self._drain)
+
+# Milliseconds per spinner frame
+SPINNER_INTERVAL = 100
+
+SPINNER_FRAMES = ['⠋', '⠙', '⠹', '⠸', '⠼', '⠴', '⠦', '⠧', '⠇', '⠏']
+
+class Spinner:
+    """
+    Activity indicator on a Label, animated by after() on the main loop.
+    Overlapping start()/stop() pairs share one animation, which keeps
+    running until the last of them stops; nothing is scheduled while idle.
+    Call it from the main loop only (workers go through UiQueue.call).
+    """
+
+    def __init__(self, label, interval=SPINNER_INTERVAL, frames=SPINNER_FRAMES):
+        self.label = label
+        self.interval = interval
+        self.frames = frames
+        self._active = 0
+        self._message = ""
+        self._frame = 0
+        self._after_id = None
+
+    @property
+    def running(self):
+        return self._active > 0
+
+    def start(self, message="Processing"):
+        self._active += 1
+        self._message = message
+        if self._after_id is None:
+            self._frame = 0
+            self._tick()
+
+    def stop(self):
+        self._active = max(0, self._active - 1)
+        if self._active:
+            return
+        if self._after_id is not None:
+            self.label.after_cancel(self._after_id)
+            self._after_id = None
+        self.label.configure(text="")
+
+    def _tick(self):
+        frame = self.frames[self._frame % len(self.frames)]
+        self.label.configure(text=f"{frame} {self._message}")
+        self._frame += 1
+        self._after_id = self.label.after(self.interval, self._tick)
+
+def open_log_file(path, max_bytes=LOG_FILE_BYTES, backups=LOG_FILE_BACKUPS):
+    """Size-rotated logger writing to path; imported on first use to keep startup light"""
+    import logging
+    import logging.handlers
+
+    logger = logging.getLogger(f"ytdownloader.gui.{os.path.abspath(path)}")
+    if not logger.handlers:
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                       encoding='utf-8')
+        handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+    return logger
+
+class LogView:
+    """
+    Bounded log on a read-only tk.Text. write() may be called from any
+    thread; messages are inserted once per UI tick and only the last
+    max_lines stay in the widget. With log_file, every message is also
+    appended to a size-rotated file.
+    """
+
+    def __init__(self, text, ui, max_lines=DEFAULT_LOG_LINES, log_file=DEFAULT_LOG_FILE):
+        self.text = text
+        self.ui = ui
+        self.max_lines = max(1, int(max_lines))
+        self._lines = 0
+        self._file = open_log_file(log_file) if log_file else None
+
+    def write(self, message):
+        if self._file is not None:
+            self._file.info(message)
+        self.ui.append(('log', id(self)), message, self._insert)
+
+    def _insert(self, messages):
+        # A burst larger than the view only needs its tail
+        messages = messages[-self.max_lines:]
+        lines = sum(message.count("\n") + 1 for message in messages)
+        # Follow new output unless the user scrolled up to read
+        follow = self.text.yview()[1] >= 1.0
+        self.text.configure(state='normal')
+        self.text.insert('end', "".join(f"{message}\n" for message in messages))
+        self._lines += lines
+        if self._lines > self.max_lines:
+            # Drop the oldest lines in one delete
+            self.text.delete("1.0", f"{self._lines - self.max_lines + 1}.0")
+            self._lines = self.max_lines
+        self.text.configure(state='disabled')
+        if follow:
+            self.text.see('end')
+
+class VideoCache:
+    """
+    Last pytube / pytubefix YouTube object, so Fetch Options and Download
+    on the same URL only fetch it once. factory(url) builds a new one.
+    """
+
+    def __init__(self, factory, ttl=VIDEO_CACHE_TTL):
+        self.factory = factory
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._url = None
+        self._video = None
+        self._fetched_at = 0.0
+
+    def get(self, url):
+        with self._lock:
+            now = time.monotonic()
+            if self._video is None or self._url != url or now - self._fetched_at > self.ttl:
+                self._video = self.factory(url)
+                self._url = url
+                self._fetched_at = now
+            return self._video
+
+def log_conversion(log, result):
+    """Log a transcode pool result; pass functools.partial(log_conversion, self.log) as on_done"""
+    if result['ok']:
+        log(f"[SUCCESS] Audio saved ({PATH_LABELS[result['path']]}): {result['output']}")
+    else:
+        log(f"[WARNING] {result['error']} Keeping original audio file.")
+
+def stream_audio(log, stream, output, fetch, reporter):
+    """
+    Encode a pytube / pytubefix audio stream to MP3 while it downloads.
+    fetch is the library's request.stream, reporter the ProgressReporter.
+    Returns False when the caller should fall back to download-then-convert.
+    """
+    mp3_file = os.path.join(output, os.path.splitext(stream.default_filename)[0] + ".mp3")
+    log("[INFO] Streaming into MP3 encoder...")
+    try:
+        result = stream_to_mp3(pytube_chunks(stream, fetch, reporter.pytube_callback), mp3_file)
+    except FileNotFoundError:
+        return False
+    if result['ok']:
+        log(f"[SUCCESS] MP3 saved: {result['output']}")
+        return True
+    log(f"[WARNING] Streaming conversion failed ({result['error']}), downloading file first")
+    reporter.reset()
+    return False
@@ -4,292 +4,25 @@ Web-based YouTube Downloader using Flask
 No Tkinter, runs in your web browser
 """
 
+import startup_timing
 from flask import Flask, render_template, request, jsonify, send_file
-import yt_dlp
 import os
-import threading
-import time
 import json
 from datetime import datetime
+from job_store import default_db_path
+from web_jobs import JobManager, create_blueprint
 
 app = Flask(__name__)
 
-# Global variables for download status
-download_status = {}
-download_progress = {}
-
-class DownloadManager:
-    def __init__(self):
-        self.downloads = {}
-    
-    def start_download(self, download_id, url, download_type, quality, output_dir):
-        """Start a download in a separate thread"""
-        def download_worker():
-            try:
-                download_status[download_id] = {
-                    'status': 'starting',
-                    'progress': 0,
-                    'message': 'Initializing download...',
-                    'error': None
-                }
-                
-                if download_type == "video":
-                    self.download_video(download_id, url, quality, output_dir)
-                elif download_type == "audio":
-                    self.download_audio(download_id, url, quality, output_dir)
-                elif download_type == "playlist":
-                    self.download_playlist(download_id, url, quality, output_dir)
-                    
-            except Exception as e:
-                download_status[download_id] = {
-                    'status': 'error',
-                    'progress': 0,
-                    'message': f'Download failed: {str(e)}',
-                    'error': str(e)
-                }
-        
-        thread = threading.Thread(target=download_worker, daemon=True)
-        thread.start()
-    
-    def progress_hook(self, download_id):
-        """Progress callback for yt-dlp"""
-        def hook(d):
-            if d['status'] == 'downloading':
-                if 'total_bytes' in d and d['total_bytes']:
-                    percent = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                    download_status[download_id] = {
-                        'status': 'downloading',
-                        'progress': percent,
-                        'message': f'Downloading... {percent:.1f}%',
-                        'error': None
-                    }
-                elif 'downloaded_bytes' in d:
-                    download_status[download_id] = {
-                        'status': 'downloading',
-                        'progress': 0,
-                        'message': f'Downloaded: {d["downloaded_bytes"]} bytes',
-                        'error': None
-                    }
-            elif d['status'] == 'finished':
-                download_status[download_id] = {
-                    'status': 'completed',
-                    'progress': 100,
-                    'message': 'Download completed!',
-                    'error': None
-                }
-        return hook
-    
-    def download_video(self, download_id, url, quality, output_dir):
-        """Download video"""
-        try:
-            download_status[download_id] = {
-                'status': 'downloading',
-                'progress': 0,
-                'message': 'Starting video download...',
-                'error': None
-            }
-            
-            # Map quality to yt-dlp format
-            quality_map = {
-                "Best": "best[height<=1080]",
-                "1080p": "best[height<=1080]",
-                "720p": "best[height<=720]",
-                "480p": "best[height<=480]",
-                "360p": "best[height<=360]"
-            }
-            
-            format_spec = quality_map.get(quality, "best")
-            
-            ydl_opts = {
-                'format': format_spec,
-                'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-                'progress_hooks': [self.progress_hook(download_id)],
-                'ignoreerrors': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            download_status[download_id] = {
-                'status': 'completed',
-                'progress': 100,
-                'message': 'Video download completed!',
-                'error': None
-            }
-            
-        except Exception as e:
-            download_status[download_id] = {
-                'status': 'error',
-                'progress': 0,
-                'message': f'Video download failed: {str(e)}',
-                'error': str(e)
-            }
-    
-    def download_audio(self, download_id, url, quality, output_dir):
-        """Download audio and convert to MP3"""
-        try:
-            download_status[download_id] = {
-                'status': 'downloading',
-                'progress': 0,
-                'message': 'Starting audio download...',
-                'error': None
-            }
-            
-            # Map quality to bitrate
-            quality_map = {
-                "192k": "192",
-                "128k": "128",
-                "64k": "64"
-            }
-            
-            bitrate = quality_map.get(quality, "192")
-            
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': bitrate,
-                }],
-                'progress_hooks': [self.progress_hook(download_id)],
-                'ignoreerrors': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            download_status[download_id] = {
-                'status': 'completed',
-                'progress': 100,
-                'message': 'Audio download completed!',
-                'error': None
-            }
-            
-        except Exception as e:
-            download_status[download_id] = {
-                'status': 'error',
-                'progress': 0,
-                'message': f'Audio download failed: {str(e)}',
-                'error': str(e)
-            }
-    
-    def download_playlist(self, download_id, url, quality, output_dir):
-        """Download playlist"""
-        try:
-            download_status[download_id] = {
-                'status': 'downloading',
-                'progress': 0,
-                'message': 'Starting playlist download...',
-                'error': None
-            }
-            
-            quality_map = {
-                "720p": "best[height<=720]",
-                "480p": "best[height<=480]",
-                "360p": "best[height<=360]"
-            }
-            
-            format_spec = quality_map.get(quality, "best[height<=720]")
-            
-            ydl_opts = {
-                'format': format_spec,
-                'outtmpl': os.path.join(output_dir, '%(playlist_title)s/%(title)s.%(ext)s'),
-                'progress_hooks': [self.progress_hook(download_id)],
-                'ignoreerrors': True,
-            }
-            
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([url])
-            
-            download_status[download_id] = {
-                'status': 'completed',
-                'progress': 100,
-                'message': 'Playlist download completed!',
-                'error': None
-            }
-            
-        except Exception as e:
-            download_status[download_id] = {
-                'status': 'error',
-                'progress': 0,
-                'message': f'Playlist download failed: {str(e)}',
-                'error': str(e)
-            }
-
-# Initialize download manager
-download_manager = DownloadManager()
+# Download queue and status, kept across restarts in this app's job database
+download_manager = JobManager(default_db_path('web_downloader'))
+app.register_blueprint(create_blueprint(download_manager, os.getcwd()))
 
 @app.route('/')
 def index():
     """Main page"""
     return render_template('index.html')
 
-@app.route('/test_url', methods=['POST'])
-def test_url():
-    """Test if URL is valid"""
-    data = request.get_json()
-    url = data.get('url', '')
-    
-    if not url:
-        return jsonify({'success': False, 'message': 'URL is empty'})
-    
-    try:
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': True,
-        }
-        
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-            
-        return jsonify({
-            'success': True,
-            'title': info.get('title', 'Unknown'),
-            'duration': info.get('duration', 'Unknown'),
-            'uploader': info.get('uploader', 'Unknown')
-        })
-        
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'URL test failed: {str(e)}'})
-
-@app.route('/start_download', methods=['POST'])
-def start_download():
-    """Start a download"""
-    data = request.get_json()
-    url = data.get('url', '')
-    download_type = data.get('type', 'video')
-    quality = data.get('quality', '720p')
-    output_dir = data.get('output_dir', os.getcwd())
-    
-    if not url:
-        return jsonify({'success': False, 'message': 'URL is empty'})
-    
-    # Create unique download ID
-    download_id = f"download_{int(time.time())}"
-    
-    # Start download
-    download_manager.start_download(download_id, url, download_type, quality, output_dir)
-    
-    return jsonify({'success': True, 'download_id': download_id})
-
-@app.route('/download_status/<download_id>')
-def get_download_status(download_id):
-    """Get download status"""
-    status = download_status.get(download_id, {
-        'status': 'unknown',
-        'progress': 0,
-        'message': 'Download not found',
-        'error': None
-    })
-    return jsonify(status)
-
-@app.route('/downloads')
-def list_downloads():
-    """List all downloads"""
-    return jsonify(download_status)
-
 if __name__ == '__main__':
     # Create templates directory if it doesn't exist
     os.makedirs('templates', exist_ok=True)
@@ -579,6 +312,8 @@ if __name__ == '__main__':
     <script>
         let currentDownloadId = null;
         let statusInterval = null;
+        let statusSource = null;
+        let lastLoggedProgress = 0;
         
         // Update quality options based on download type
         document.querySelectorAll('input[name="type"]').forEach(radio => {
@@ -594,6 +329,7 @@ if __name__ == '__main__':
                     <option value="192k">192k</option>
                     <option value="128k">128k</option>
                     <option value="64k">64k</option>
+                    <option value="original">Original (no re-encode)</option>
                 `;
             } else if (type === 'playlist') {
                 qualitySelect.innerHTML = `
@@ -701,9 +437,8 @@ if __name__ == '__main__':
                 const result = await response.json();
                 
                 if (result.success) {
-                    currentDownloadId = result.download_id;
-                    addLog(`Download started with ID: ${currentDownloadId}`, 'success');
-                    startStatusPolling();
+                    addLog(`Download started with ID: ${result.download_id}`, 'success');
+                    startStatusUpdates(result.download_id);
                 } else {
                     addLog(`Failed to start download: ${result.message}`, 'error');
                     showAlert(result.message, 'error');
@@ -714,40 +449,73 @@ if __name__ == '__main__':
             }
         });
         
-        function startStatusPolling() {
+        function handleStatus(status) {
+            // Update progress bar
+            const progressFill = document.getElementById('progressFill');
+            const statusText = document.getElementById('status');
+            
+            progressFill.style.width = `${status.progress}%`;
+            statusText.textContent = status.message;
+            
+            // Add log entry for status changes
+            if (status.status === 'completed') {
+                addLog('Download completed successfully!', 'success');
+                showAlert('Download completed!', 'success');
+                stopStatusUpdates();
+            } else if (status.status === 'error') {
+                addLog(`Download failed: ${status.error}`, 'error');
+                showAlert(`Download failed: ${status.error}`, 'error');
+                stopStatusUpdates();
+            } else if (status.status === 'downloading' && status.progress - lastLoggedProgress >= 10) {
+                lastLoggedProgress = Math.floor(status.progress / 10) * 10;
+                addLog(`Progress: ${status.progress.toFixed(1)}%`, 'info');
+            }
+        }
+        
+        function stopStatusUpdates() {
+            if (statusSource) {
+                statusSource.close();
+                statusSource = null;
+            }
             if (statusInterval) {
                 clearInterval(statusInterval);
+                statusInterval = null;
+            }
+            currentDownloadId = null;
+        }
+        
+        function startStatusUpdates(downloadId) {
+            stopStatusUpdates();
+            currentDownloadId = downloadId;
+            lastLoggedProgress = 0;
+            
+            // Browsers without EventSource fall back to polling
+            if (!window.EventSource) {
+                startStatusPolling();
+                return;
             }
             
+            statusSource = new EventSource(`/download_events/${currentDownloadId}`);
+            statusSource.addEventListener('status', (event) => {
+                handleStatus(JSON.parse(event.data));
+            });
+            
+            // Dropped stream (proxy, server restart): poll instead of letting the browser retry forever
+            statusSource.onerror = () => {
+                statusSource.close();
+                statusSource = null;
+                addLog('Status stream lost, polling for updates instead', 'info');
+                startStatusPolling();
+            };
+        }
+        
+        function startStatusPolling() {
             statusInterval = setInterval(async () => {
                 if (!currentDownloadId) return;
                 
                 try {
                     const response = await fetch(`/download_status/${currentDownloadId}`);
-                    const status = await response.json();
-                    
-                    // Update progress bar
-                    const progressFill = document.getElementById('progressFill');
-                    const statusText = document.getElementById('status');
-                    
-                    progressFill.style.width = `${status.progress}%`;
-                    statusText.textContent = status.message;
-                    
-                    // Add log entry for status changes
-                    if (status.status === 'completed') {
-                        addLog('Download completed successfully!', 'success');
-                        showAlert('Download completed!', 'success');
-                        clearInterval(statusInterval);
-                        currentDownloadId = null;
-                    } else if (status.status === 'error') {
-                        addLog(`Download failed: ${status.error}`, 'error');
-                        showAlert(`Download failed: ${status.error}`, 'error');
-                        clearInterval(statusInterval);
-                        currentDownloadId = null;
-                    } else if (status.status === 'downloading') {
-                        addLog(`Progress: ${status.progress.toFixed(1)}%`, 'info');
-                    }
-                    
+                    handleStatus(await response.json());
                 } catch (error) {
                     addLog(`Error checking status: ${error}`, 'error');
                 }
@@ -772,4 +540,12 @@ if __name__ == '__main__':
     print("Press Ctrl+C to stop the server")
     print("=" * 40)
     
+    # Before resuming, so a startup benchmark exits without touching the job database
+    startup_timing.mark_ready("web_downloader_works")
+    
+    # With the debug reloader only the serving child process resumes jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        resumed = download_manager.resume_jobs()
+        if resumed:
+            print(f"Resumed {resumed} unfinished download(s)")
     app.run(debug=True, port=5550) 
\ No newline at end of file
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Download jobs and JSON routes shared by the web downloaders
+Each app builds a JobManager and registers create_blueprint(manager, ...)
+"""
+
+from flask import Blueprint, Response, request, jsonify, stream_with_context
+from lazy_import import lazy_module
+import os
+import time
+import uuid
+from job_queue import DownloadQueue, DEFAULT_MAX_WORKERS
+from status_events import StatusBroadcaster
+from job_store import JobStore, RESUMABLE_STATES
+from progress_reporter import ProgressReporter
+from status_retention import RetentionPolicy, FINISHED_STATES
+from info_cache import InfoCache
+from playlist_runner import PlaylistDownloader
+from download_archive import get_archive
+from audio_transcode import DEFAULT_AUDIO_FORMAT, get_transcode_pool, describe_results, downloaded_files
+
+# Imported on first use so the server comes up without waiting for it
+yt_dlp = lazy_module('yt_dlp')
+
+# Returned for ids we have never seen
+UNKNOWN_STATUS = {
+    'status': 'unknown',
+    'progress': 0,
+    'message': 'Download not found',
+    'error': None
+}
+
+# Values accepted for a download's 'type'
+DOWNLOAD_TYPES = ('video', 'audio', 'playlist', 'playlist_sync')
+
+# Upper bound on ids accepted by the batch endpoints
+MAX_BATCH_IDS = 500
+
+# Page sizes for /downloads
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def new_download_id():
+    """Sortable, collision-free download ID"""
+    return f"download_{int(time.time())}_{uuid.uuid4().hex[:12]}"
+
+def parse_download_ids(value):
+    """Split a comma separated ?ids= value, dropping blanks and duplicates"""
+    return list(dict.fromkeys(part.strip() for part in value.split(',') if part.strip()))
+
+class JobManager:
+    """Download queue and status of one web app, kept in memory and in its job store"""
+    
+    def __init__(self, db_path, max_workers=DEFAULT_MAX_WORKERS):
+        self.downloads = {}
+        
+        # Latest status of every download, and per-video results of finished playlists
+        self.download_status = {}
+        self.playlist_results = {}
+        
+        # Pushes status changes to /download_events subscribers
+        self.status_broadcaster = StatusBroadcaster()
+        
+        # Durable copy of download_status, reloaded on startup
+        self.job_store = JobStore(db_path)
+        
+        # Extraction results shared by /test_url and the download workers
+        self.info_cache = InfoCache()
+        
+        # Bounds how many finished jobs download_status keeps, and for how long
+        self.retention = RetentionPolicy()
+        
+        self.queue = DownloadQueue(self.run_download, max_workers)
+    
+    def evict_finished(self):
+        """Drop finished jobs past their retention from memory and from the job store"""
+        evicted = self.retention.evict()
+        if evicted:
+            for download_id in evicted:
+                self.download_status.pop(download_id, None)
+                self.playlist_results.pop(download_id, None)
+            self.job_store.delete(evicted)
+    
+    def set_status(self, download_id, status, progress, message, error=None):
+        """Record a download's status and notify stream subscribers if it changed"""
+        entry = {
+            'status': status,
+            'progress': progress,
+            'message': message,
+            'error': error
+        }
+        previous = self.download_status.get(download_id)
+        if previous == entry:
+            return
+        self.download_status[download_id] = entry
+        self.status_broadcaster.publish(download_id, entry)
+        
+        # State transitions are saved right away, progress ticks are batched
+        status_changed = previous is None or previous['status'] != status
+        self.job_store.update(download_id, entry, immediate=previous is not None and status_changed)
+        
+        if status_changed:
+            self.retention.record(download_id, status)
+            if status in FINISHED_STATES:
+                self.evict_finished()
+    
+    def start_download(self, download_id, url, download_type, quality, output_dir):
+        """Queue a download for the worker pool"""
+        message = 'Waiting for a free download slot...'
+        self.job_store.create(download_id, url, download_type, quality, output_dir, {
+            'status': 'queued',
+            'progress': 0,
+            'message': message,
+            'error': None
+        })
+        self.set_status(download_id, 'queued', 0, message)
+        return self.queue.submit(download_id, url, download_type, quality, output_dir)
+    
+    def resume_jobs(self):
+        """Reload saved jobs and requeue the ones that never finished"""
+        resumed = 0
+        for job in self.job_store.load_jobs():
+            if job['status'] in RESUMABLE_STATES:
+                self.start_download(job['download_id'], job['url'], job['download_type'],
+                                    job['quality'], job['output_dir'])
+                resumed += 1
+            else:
+                self.download_status[job['download_id']] = {
+                    'status': job['status'],
+                    'progress': job['progress'],
+                    'message': job['message'],
+                    'error': job['error']
+                }
+                self.retention.record(job['download_id'], job['status'], finished_at=job['updated_at'])
+        self.evict_finished()
+        return resumed
+    
+    def run_download(self, download_id, url, download_type, quality, output_dir):
+        """Run a queued download on one of the pool's worker threads"""
+        try:
+            self.set_status(download_id, 'starting', 0, 'Initializing download...')
+            
+            if download_type == "video":
+                self.download_video(download_id, url, quality, output_dir)
+            elif download_type == "audio":
+                self.download_audio(download_id, url, quality, output_dir)
+            elif download_type in ("playlist", "playlist_sync"):
+                self.download_playlist(download_id, url, quality, output_dir, sync=download_type == "playlist_sync")
+            else:
+                # Saved before types were checked; never leave it 'starting'
+                raise ValueError(f'Unknown download type: {download_type}')
+                
+        except Exception as e:
+            self.set_status(download_id, 'error', 0, f'Download failed: {str(e)}', str(e))
+    
+    def progress_hook(self, download_id):
+        """Progress callback for yt-dlp, throttled to a few updates per second"""
+        def report(record):
+            if record.status == 'downloading':
+                if record.total_bytes:
+                    self.set_status(download_id, 'downloading', record.percent, f'Downloading... {record.percent:.1f}%')
+                else:
+                    self.set_status(download_id, 'downloading', 0, f'Downloaded: {record.downloaded_bytes} bytes')
+            elif record.status == 'finished':
+                # More files may follow (merges, playlists); completion is set by the caller
+                self.set_status(download_id, 'processing', 100, 'Download finished, processing...')
+        return ProgressReporter(report)
+    
+    def download_video(self, download_id, url, quality, output_dir):
+        """Download video"""
+        try:
+            self.set_status(download_id, 'downloading', 0, 'Starting video download...')
+            
+            # Map quality to yt-dlp format
+            quality_map = {
+                "Best": "best[height<=1080]",
+                "1080p": "best[height<=1080]",
+                "720p": "best[height<=720]",
+                "480p": "best[height<=480]",
+                "360p": "best[height<=360]"
+            }
+            
+            format_spec = quality_map.get(quality, "best")
+            
+            ydl_opts = {
+                'format': format_spec,
+                'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+                'progress_hooks': [self.progress_hook(download_id)],
+                'ignoreerrors': True,
+            }
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                # Reuses the extraction from a preceding /test_url when cached
+                ydl.process_ie_result(self.info_cache.extract(ydl, url), download=True)
+            
+            self.set_status(download_id, 'completed', 100, 'Video download completed!')
+            
+        except Exception as e:
+            self.set_status(download_id, 'error', 0, f'Video download failed: {str(e)}', str(e))
+    
+    def download_audio(self, download_id, url, quality, output_dir):
+        """Download audio and convert it, remuxing instead of re-encoding when the codec already fits"""
+        try:
+            self.set_status(download_id, 'downloading', 0, 'Starting audio download...')
+            
+            # Map quality to bitrate
+            quality_map = {
+                "192k": "192",
+                "128k": "128",
+                "64k": "64",
+                "original": None
+            }
+            
+            bitrate = quality_map.get(quality, "192")
+            # "original" keeps the codec the site serves, remuxed without re-encoding
+            audio_format = "original" if quality == "original" else DEFAULT_AUDIO_FORMAT
+            
+            ydl_opts = {
+                'format': 'bestaudio/best',
+                'outtmpl': os.path.join(output_dir, '%(title)s.%(ext)s'),
+                'progress_hooks': [self.progress_hook(download_id)],
+                'ignoreerrors': True,
+            }
+            
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                # Reuses the extraction from a preceding /test_url when cached
+                info = ydl.process_ie_result(self.info_cache.extract(ydl, url), download=True)
+            
+            # One file for a video, one per entry for a playlist
+            downloads = downloaded_files(info)
+            if not downloads:
+                raise ValueError('Downloaded audio file not found')
+            
+            def converted(results):
+                failed = [result for result in results if not result['ok']]
+                if not failed:
+                    self.set_status(download_id, 'completed', 100,
+                                    f"Audio download completed! ({describe_results(results)})")
+                else:
+                    error = failed[0]['error']
+                    if len(results) > 1:
+                        error = f"{len(failed)}/{len(results)} files failed, first: {error}"
+                    self.set_status(download_id, 'error', 100, f"Audio conversion failed: {error}", error)
+            
+            # Conversion runs on the transcode pool so this worker can take the next download
+            self.set_status(download_id, 'processing', 100, f'Preparing {audio_format} audio...')
+            get_transcode_pool().submit_downloads(downloads, bitrate, on_all_done=converted, audio_format=audio_format)
+            
+        except Exception as e:
+            self.set_status(download_id, 'error', 0, f'Audio download failed: {str(e)}', str(e))
+    
+    def download_playlist(self, download_id, url, quality, output_dir, sync=False):
+        """Download playlist, skipping videos already in the output folder's archive"""
+        try:
+            self.set_status(download_id, 'downloading', 0, 'Starting playlist download...')
+            
+            quality_map = {
+                "720p": "best[height<=720]",
+                "480p": "best[height<=480]",
+                "360p": "best[height<=360]"
+            }
+            
+            format_spec = quality_map.get(quality, "best[height<=720]")
+            
+            ydl_opts = {
+                'format': format_spec,
+                'outtmpl': os.path.join(output_dir, '%(playlist_title)s/%(title)s.%(ext)s'),
+            }
+            
+            def report(summary):
+                total = f"{summary['total']}+" if summary['listing'] else summary['total']
+                self.set_status(download_id, 'downloading', summary['percent'],
+                                f"Downloading playlist... {summary['completed']}/{total} done, "
+                                f"{summary['failed']} failed, {summary['active']} active")
+            
+            # Entries are downloaded several at a time, see YTDL_PLAYLIST_WORKERS
+            # On channels, sync stops listing once it reaches videos that were already mirrored
+            downloader = PlaylistDownloader(ydl_opts, on_progress=report, archive=get_archive(output_dir), sync=sync)
+            results = downloader.run(url)
+            self.playlist_results[download_id] = results
+            
+            failed = sum(1 for result in results if result['status'] == 'error')
+            skipped = downloader.summary()['skipped']
+            self.set_status(download_id, 'completed', 100,
+                            f'Playlist download completed! {len(results) - failed}/{len(results)} videos downloaded, '
+                            f'{skipped} already archived')
+            
+        except Exception as e:
+            self.set_status(download_id, 'error', 0, f'Playlist download failed: {str(e)}', str(e))
+
+def create_blueprint(manager, default_output_dir):
+    """Routes for starting downloads and reading their status, backed by manager"""
+    blueprint = Blueprint('jobs', __name__)
+        
+    @blueprint.route('/test_url', methods=['POST'])
+    def test_url():
+        """Test if URL is valid"""
+        data = request.get_json()
+        url = data.get('url', '')
+        
+        if not url:
+            return jsonify({'success': False, 'message': 'URL is empty'})
+        
+        try:
+            ydl_opts = {
+                'quiet': True,
+                'no_warnings': True,
+                'extract_flat': True,
+            }
+        
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = manager.info_cache.extract(ydl, url)
+            
+            return jsonify({
+                'success': True,
+                'title': info.get('title', 'Unknown'),
+                'duration': info.get('duration', 'Unknown'),
+                'uploader': info.get('uploader', 'Unknown')
+            })
+        
+        except Exception as e:
+            return jsonify({'success': False, 'message': f'URL test failed: {str(e)}'})
+    
+    @blueprint.route('/start_download', methods=['POST'])
+    def start_download():
+        """Start a download"""
+        data = request.get_json()
+        url = data.get('url', '')
+        download_type = data.get('type', 'video')
+        quality = data.get('quality', '720p')
+        output_dir = data.get('output_dir', default_output_dir)
+        
+        if not url:
+            return jsonify({'success': False, 'message': 'URL is empty'})
+        if download_type not in DOWNLOAD_TYPES:
+            return jsonify({'success': False, 'message': f'Unknown download type: {download_type}'}), 400
+        
+        # Create unique download ID (several can be submitted in the same second)
+        download_id = new_download_id()
+        
+        # Queue download
+        queued = manager.start_download(download_id, url, download_type, quality, output_dir)
+        
+        return jsonify({'success': True, 'download_id': download_id, 'queued': queued})
+    
+    @blueprint.route('/info_cache')
+    def info_cache_stats():
+        """Get metadata cache size and hit/miss counters"""
+        return jsonify(manager.info_cache.stats())
+    
+    @blueprint.route('/queue')
+    def queue_status():
+        """Get worker pool usage and queue depth"""
+        stats = manager.queue.stats()
+        stats['transcoding'] = get_transcode_pool().stats()
+        return jsonify(stats)
+    
+    @blueprint.route('/download_events')
+    @blueprint.route('/download_events/<download_id>')
+    def download_events(download_id=None):
+        """Stream status changes for one download, or several with ?ids=a,b,c"""
+        download_ids = [download_id] if download_id else parse_download_ids(request.args.get('ids', ''))
+        download_ids = [download_id for download_id in download_ids if download_id in manager.download_status]
+        if not download_ids:
+            return jsonify({'success': False, 'message': 'Download not found'}), 404
+        if len(download_ids) > MAX_BATCH_IDS:
+            return jsonify({'success': False, 'message': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+        
+        stream = manager.status_broadcaster.stream(download_ids, manager.download_status.get)
+        return Response(stream_with_context(stream), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        })
+    
+    @blueprint.route('/download_status')
+    def get_download_statuses():
+        """Get the status of several downloads at once: /download_status?ids=a,b,c"""
+        download_ids = parse_download_ids(request.args.get('ids', ''))
+        if not download_ids:
+            return jsonify({'success': False, 'message': 'No download ids given'}), 400
+        if len(download_ids) > MAX_BATCH_IDS:
+            return jsonify({'success': False, 'message': f'At most {MAX_BATCH_IDS} ids per request'}), 400
+        
+        for download_id in download_ids:
+            manager.retention.touch(download_id)
+        return jsonify({download_id: manager.download_status.get(download_id, UNKNOWN_STATUS)
+                        for download_id in download_ids})
+    
+    @blueprint.route('/download_status/<download_id>')
+    def get_download_status(download_id):
+        """Get download status"""
+        manager.retention.touch(download_id)
+        status = manager.download_status.get(download_id, UNKNOWN_STATUS)
+        return jsonify(status)
+    
+    @blueprint.route('/download_status/<download_id>/items')
+    def get_playlist_results(download_id):
+        """Get the per-video results of a finished playlist download"""
+        if download_id not in manager.playlist_results:
+            return jsonify({'success': False, 'message': 'No playlist results for this download'}), 404
+        manager.retention.touch(download_id)
+        return jsonify({'download_id': download_id, 'items': manager.playlist_results[download_id]})
+    
+    @blueprint.route('/downloads')
+    def list_downloads():
+        """List downloads newest first: /downloads?status=completed,error&offset=0&limit=50"""
+        manager.evict_finished()
+        
+        try:
+            offset = max(0, int(request.args.get('offset', 0)))
+            limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', DEFAULT_PAGE_SIZE))))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'offset and limit must be integers'}), 400
+        
+        wanted = {part.strip() for part in request.args.get('status', '').split(',') if part.strip()}
+        entries = [(download_id, status) for download_id, status in reversed(list(manager.download_status.items()))
+                   if not wanted or status['status'] in wanted]
+        
+        return jsonify({
+            'total': len(entries),
+            'offset': offset,
+            'limit': limit,
+            'downloads': [dict(status, download_id=download_id)
+                          for download_id, status in entries[offset:offset + limit]]
+        })
+        
+    return blueprint